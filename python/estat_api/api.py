@@ -2,9 +2,20 @@
 """
 
 import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
 import requests
 
+from estat_api.deadline import Deadline
+from estat_api.decoders import decode_stats_data, get_decoder
+from estat_api.xml_stream import iter_values
+
 TIMEOUT_SEC: int = 30
+# sink へ書き込む際の1回あたりのバイト数
+SINK_CHUNK_SIZE: int = 65536
 
 
 class EstatAPI:
@@ -15,7 +26,9 @@ class EstatAPI:
     - 参考資料: https://www.e-stat.go.jp/api/sites/default/files/uploads/2019/07/API-specVer3.0.pdf
     """
 
-    def __init__(self, app_id, version="3.0", use_https=True):
+    def __init__(self, app_id, version="3.0", use_https=True,
+                 connect_timeout=None, read_timeout=TIMEOUT_SEC, hedge=None,
+                 json_decoder="auto"):
         """
         EstatAPIクラスのコンストラクタ。
 
@@ -23,12 +36,66 @@ class EstatAPI:
             app_id (str): e-Statから取得したアプリケーションID。
             version (str, optional): APIのバージョン。デフォルトは "3.0"。
             use_https (bool, optional): HTTPSプロトコルを使用するかどうか。デフォルトは True。
+            connect_timeout (float, optional): 接続タイムアウト秒数。省略時は read_timeout と同じ。
+            read_timeout (float, optional): 読み込みタイムアウト秒数。デフォルトは TIMEOUT_SEC。
+            hedge (HedgePolicy, optional): 指定した場合、GETリクエストをヘッジします。
+            json_decoder (str, optional): JSONデコーダ ('auto', 'orjson', 'msgspec', 'json')。
+                                          デフォルトは 'auto' で、orjson, msgspec, 標準ライブラリの順に使います。
         """
         if not app_id:
             raise ValueError("アプリケーションID (app_id) は必須です。")
         self.app_id = app_id
         protocol = "https" if use_https else "http"
         self.base_url = f"{protocol}://api.e-stat.go.jp/rest/{version}/app"
+        if connect_timeout is None:
+            self.timeout = read_timeout
+        else:
+            self.timeout = (connect_timeout, read_timeout)
+        self.hedge = hedge
+        self.json_decoder = json_decoder
+        self._json_decode = get_decoder(json_decoder)
+        self._local = threading.local()
+
+    @contextmanager
+    def deadline(self, seconds):
+        """
+        ブロック内のすべてのリクエストに共通の期限を設定します。
+
+        ページングや再試行をまたいで適用され、各リクエストの接続・読み込み
+        タイムアウトは残り時間以下に切り詰められます。sink への書き込みや
+        iter_stats_data_xml のようにストリーミングで読む場合は、チャンクごとに
+        期限を確認します。期限を過ぎた後のリクエストは送信されず、エラーとして
+        扱われます。入れ子にした場合は早い方の期限が使われます。
+
+        ストリーミングしない呼び出しでは、requests が本文を一括で読み込むため、
+        本文が少しずつ届く場合は読み込みタイムアウトの分だけ期限を超えることがあります。
+        期限はスレッドごとに保持されます。download_catalog_resources は期限を
+        ダウンロード用のスレッドに引き継ぎますが、独自にスレッドを起こして
+        リクエストする場合は current_deadline() の値を渡してください。
+
+        Args:
+            seconds (float): 期限（秒）。
+
+        Example:
+            with api.deadline(60):
+                for page in AdaptivePager(api).iter_pages(statsDataId="0003411678"):
+                    ...
+        """
+        previous = self.current_deadline()
+        self._local.deadline = Deadline.earliest(previous, Deadline(seconds))
+        try:
+            yield self._local.deadline
+        finally:
+            self._local.deadline = previous
+
+    def current_deadline(self):
+        """
+        現在のスレッドで有効な期限を返します。deadline の外では None。
+
+        Returns:
+            Deadline or None: 有効な期限。
+        """
+        return getattr(self._local, 'deadline', None)
 
     def _build_endpoint(self, path, data_format):
         """
@@ -53,18 +120,24 @@ class EstatAPI:
         # XML形式 (デフォルト)
         return f"{self.base_url}/{path}"
 
-    def _make_request(self, method, path, data_format="json", params=None):
+    def _send(self, method, path, data_format="json", params=None, timeout=None,
+              stream=False):
         """
-        APIにHTTPリクエストを送信する内部メソッド。
+        APIにHTTPリクエストを送信し、レスポンスオブジェクトをそのまま返す内部メソッド。
+
+        HTTPエラーやタイムアウトは例外として呼び出し元に送出します。
 
         Args:
             method (str): 'GET' または 'POST'。
             path (str): APIのエンドポイントのパス。
             data_format (str, optional): レスポンスのデータ形式 ('json', 'xml', 'csv', 'jsonp')。
             params (dict, optional): APIに送信するパラメータ。
+            timeout (float or tuple, optional): タイムアウト秒数、または (接続, 読み込み) の組。
+                                                省略時はコンストラクタで指定した値。
+            stream (bool, optional): レスポンス本文を逐次読み込むかどうか。デフォルトは False。
 
         Returns:
-            dict or str: APIからのレスポンス。JSONの場合は辞書、それ以外はテキスト。
+            requests.Response: APIからのレスポンス。
         """
         endpoint = self._build_endpoint(path, data_format)
 
@@ -76,25 +149,147 @@ class EstatAPI:
         if path == 'postDataset':
             headers['Content-Type'] = 'application/x-www-form-urlencoded'
 
-        try:
-            if method.upper() == 'GET':
+        if timeout is None:
+            timeout = self.timeout
+        # ヘッジは別スレッドで遅れて送られるため、期限は送信の直前に切り詰めます
+        deadline = self.current_deadline()
+
+        def clamp():
+            return timeout if deadline is None else deadline.timeout(timeout)
+
+        if method.upper() == 'GET':
+            def send():
                 response = requests.get(
-                    endpoint, timeout=TIMEOUT_SEC, params=all_params
+                    endpoint, timeout=clamp(), params=all_params, stream=stream
                 )
-            elif method.upper() == 'POST':
-                response = requests.post(
-                    endpoint, timeout=TIMEOUT_SEC, data=all_params, headers=headers
-                )
-            else:
-                raise ValueError(f"サポートされていないHTTPメソッドです: {method}")
-
+                response.raise_for_status()
+                return response
+
+            # ストリーミングしない冪等なGETのみヘッジします
+            if self.hedge is not None and not stream:
+                return self.hedge.run(send, key=path)
+            return send()
+
+        if method.upper() == 'POST':
+            response = requests.post(
+                endpoint, timeout=clamp(), data=all_params, headers=headers,
+                stream=stream
+            )
             response.raise_for_status()
+            return response
+
+        raise ValueError(f"サポートされていないHTTPメソッドです: {method}")
 
-            if data_format == "json" or data_format == "jsonp":
-                return response.json()
-            else:
-                response.encoding = 'utf-8'
-                return response.text
+    def decode(self, response, data_format="json"):
+        """
+        レスポンスをデータ形式に応じてデコードします。
+
+        JSONはテキストを経由せず、バイト列から設定したデコーダで直接デコードします。
+        gzip / deflate などの圧縮転送は requests の既定のヘッダで要求され、透過的に展開されます。
+
+        Returns:
+            dict or str: JSONの場合は辞書、それ以外はテキスト。
+
+        Raises:
+            ValueError: JSONとしてデコードできない場合。
+        """
+        if data_format == "json":
+            return self._json_decode(response.content)
+        if data_format == "jsonp":
+            return response.json()
+        response.encoding = 'utf-8'
+        return response.text
+
+    @staticmethod
+    def _iter_chunks(response, chunk_size, deadline=None):
+        """
+        レスポンス本文をチャンク単位で返す内部メソッド。期限がある場合はチャンクごとに確認します。
+
+        Raises:
+            DeadlineExceeded: 読み込み中に期限を過ぎた場合。
+        """
+        for chunk in response.iter_content(chunk_size):
+            if deadline is not None:
+                deadline.check()
+            yield chunk
+
+    @staticmethod
+    def _write_to_sink(response, sink, chunk_size=SINK_CHUNK_SIZE, deadline=None):
+        """
+        レスポンス本文をデコードせずに sink へ書き込む内部メソッド。
+
+        Args:
+            response (requests.Response): stream=True で取得したレスポンス。
+            sink (str, os.PathLike or writable): 書き込み先のパス、またはバイナリ書き込み可能なオブジェクト。
+            chunk_size (int, optional): 1回に書き込むバイト数。
+            deadline (Deadline, optional): 書き込み中に確認する期限。
+
+        sink がパスの場合は同じディレクトリの一時ファイルに書き込み、最後まで
+        書き込めた場合のみ sink の名前に置き換えます。途中で失敗した場合は
+        一時ファイルを削除するため、途中で切れたファイルは残りません。
+
+        Returns:
+            int: 書き込んだバイト数。
+        """
+        if isinstance(sink, (str, os.PathLike)):
+            path = os.fspath(sink)
+            fd, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(path) or None,
+                prefix=os.path.basename(path) + ".", suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    n_bytes = EstatAPI._write_to_sink(response, f, chunk_size, deadline)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+            return n_bytes
+        n_bytes = 0
+        for chunk in EstatAPI._iter_chunks(response, chunk_size, deadline):
+            sink.write(chunk)
+            n_bytes += len(chunk)
+        return n_bytes
+
+    def _make_request(self, method, path, data_format="json", params=None, sink=None,
+                      decode=None):
+        """
+        APIにHTTPリクエストを送信する内部メソッド。
+
+        Args:
+            method (str): 'GET' または 'POST'。
+            path (str): APIのエンドポイントのパス。
+            data_format (str, optional): レスポンスのデータ形式 ('json', 'xml', 'csv', 'jsonp')。
+            params (dict, optional): APIに送信するパラメータ。
+            sink (str, os.PathLike or writable, optional): 指定した場合、レスポンス本文を
+                デコードせずにこのパスまたはバッファへ書き込みます。
+            decode (callable, optional): 指定した場合、レスポンス本文のバイト列をこの関数でデコードします。
+
+        Returns:
+            dict or str: APIからのレスポンス。JSONの場合は辞書、それ以外はテキスト。
+                         sink を指定した場合は {"status", "bytes", "elapsed"} のメタ情報。
+        """
+        try:
+            if sink is not None:
+                start = time.perf_counter()
+                response = self._send(method, path, data_format, params, stream=True)
+                with response:
+                    n_bytes = self._write_to_sink(
+                        response, sink, deadline=self.current_deadline())
+                return {
+                    "status": response.status_code,
+                    "bytes": n_bytes,
+                    "elapsed": time.perf_counter() - start,
+                }
+
+            response = self._send(method, path, data_format, params)
+            try:
+                if decode is not None:
+                    return decode(response.content)
+                return self.decode(response, data_format)
+            except ValueError as e:
+                # json / orjson / msgspec のデコードエラーはいずれも ValueError のサブクラスです
+                print(f"レスポンスのデコードに失敗しました: {e}")
+                return None
 
         except requests.exceptions.HTTPError as e:
             print(
@@ -105,7 +300,7 @@ class EstatAPI:
             print(f"リクエストエラーが発生しました: {e}")
             return None
 
-    def get_stats_list(self, data_format="json", **kwargs):
+    def get_stats_list(self, data_format="json", sink=None, **kwargs):
         """
         2.1. 統計表情報取得 (getStatsList)
 
@@ -113,12 +308,14 @@ class EstatAPI:
 
         Args:
             data_format (str, optional): レスポンス形式 ('json', 'xml', 'csv', 'jsonp')。
+            sink (str, os.PathLike or writable, optional): 指定した場合、レスポンスを
+                デコードせずに書き込み、メタ情報のみを返します。
             **kwargs: surveyYears, openYears, statsField, statsCode, searchWord など、
                       仕様書に記載されているパラメータ。
         """
-        return self._make_request('GET', 'getStatsList', data_format, params=kwargs)
+        return self._make_request('GET', 'getStatsList', data_format, params=kwargs, sink=sink)
 
-    def get_meta_info(self, statsDataId, data_format="json", **kwargs):
+    def get_meta_info(self, statsDataId, data_format="json", sink=None, **kwargs):
         """
         2.2. メタ情報取得 (getMetaInfo)
 
@@ -127,13 +324,15 @@ class EstatAPI:
         Args:
             statsDataId (str): 統計表ID。
             data_format (str, optional): レスポンス形式 ('json', 'xml', 'csv', 'jsonp')。
+            sink (str, os.PathLike or writable, optional): 指定した場合、レスポンスを
+                デコードせずに書き込み、メタ情報のみを返します。
             **kwargs: explanationGetFlg などのパラメータ。
         """
         params = kwargs
         params['statsDataId'] = statsDataId
-        return self._make_request('GET', 'getMetaInfo', data_format, params=params)
+        return self._make_request('GET', 'getMetaInfo', data_format, params=params, sink=sink)
 
-    def get_stats_data(self, data_format="json", **kwargs):
+    def get_stats_data(self, data_format="json", sink=None, **kwargs):
         """
         2.3. 統計データ取得 (getStatsData)
 
@@ -141,14 +340,103 @@ class EstatAPI:
 
         Args:
             data_format (str, optional): レスポンス形式 ('json', 'xml', 'csv', 'jsonp')。
+            sink (str, os.PathLike or writable, optional): 指定した場合、レスポンスを
+                デコードせずに書き込み、メタ情報のみを返します。
+            **kwargs: statsDataId または dataSetId のいずれかが必須。
+                      その他、lvTab, cdArea, startPosition などの絞り込みパラメータ。
+        """
+        if 'statsDataId' not in kwargs and 'dataSetId' not in kwargs:
+            raise ValueError("'statsDataId' または 'dataSetId' のいずれか一つは必須です。")
+        return self._make_request('GET', 'getStatsData', data_format, params=kwargs, sink=sink)
+
+    def fetch_stats_data(self, data_format="json", **kwargs):
+        """
+        2.3. 統計データ取得 (getStatsData) のレスポンスをデコードせずに返します。
+
+        他のメソッドと異なり、エラーを表示して None を返すのではなく例外として送出します。
+        ページングや再試行を呼び出し側で制御する場合に使います。
+
+        Args:
+            data_format (str, optional): レスポンス形式 ('json', 'xml', 'csv', 'jsonp')。
+            **kwargs: statsDataId または dataSetId のいずれかが必須。
+                      その他、lvTab, cdArea, startPosition などの絞り込みパラメータ。
+
+        Returns:
+            tuple: (requests.Response, 応答までの秒数)
+
+        Raises:
+            requests.exceptions.HTTPError: HTTPエラーの場合。
+            requests.exceptions.RequestException: タイムアウトや接続エラーの場合。
+            DeadlineExceeded: deadline で設定した期限を過ぎた場合。
+        """
+        if 'statsDataId' not in kwargs and 'dataSetId' not in kwargs:
+            raise ValueError("'statsDataId' または 'dataSetId' のいずれか一つは必須です。")
+        start = time.perf_counter()
+        response = self._send('GET', 'getStatsData', data_format, params=kwargs)
+        return response, time.perf_counter() - start
+
+    def get_stats_data_typed(self, **kwargs):
+        """
+        2.3. 統計データ取得 (getStatsData) の型付き版
+
+        JSON形式のレスポンスを msgspec の型付き構造体 (estat_api.structs.StatsDataResponse)
+        にデコードして返します。msgspec のインストールが必要です。
+
+        Args:
             **kwargs: statsDataId または dataSetId のいずれかが必須。
                       その他、lvTab, cdArea, startPosition などの絞り込みパラメータ。
         """
         if 'statsDataId' not in kwargs and 'dataSetId' not in kwargs:
             raise ValueError("'statsDataId' または 'dataSetId' のいずれか一つは必須です。")
-        return self._make_request('GET', 'getStatsData', data_format, params=kwargs)
+        return self._make_request(
+            'GET', 'getStatsData', "json", params=kwargs, decode=decode_stats_data)
+
+    def iter_stats_data_xml(self, chunk_size=65536, **kwargs):
+        """
+        2.3. 統計データ取得 (getStatsData) のXMLストリーミング版
+
+        XML形式のレスポンスをチャンク単位で逐次パースし、`<VALUE>` 要素を
+        1件ずつ辞書として返します。レスポンス全体を文字列やDOMとして保持しません。
+
+        Args:
+            chunk_size (int, optional): 1回に読み込むバイト数。デフォルトは 65536。
+            **kwargs: statsDataId または dataSetId のいずれかが必須。
+                      その他、lvTab, cdArea, startPosition などの絞り込みパラメータ。
+
+        Returns:
+            iterator: 属性を '@' 付きのキー、値を '$' キーに格納した VALUE レコードのイテレータ。
+                      e-Stat API が STATUS に 0 以外を返した場合、反復中に EstatAPIError を送出します。
+                      本文の読み込み中の接続エラーや期限切れは RequestException として送出します。
+        """
+        if 'statsDataId' not in kwargs and 'dataSetId' not in kwargs:
+            raise ValueError("'statsDataId' または 'dataSetId' のいずれか一つは必須です。")
+        return self._iter_stats_data_xml(
+            chunk_size, kwargs, self.current_deadline())
+
+    def _iter_stats_data_xml(self, chunk_size, params, deadline=None):
+        """
+        iter_stats_data_xml の本体となる内部ジェネレータ。
+
+        呼び出し時に有効だった期限を、チャンクを読むたびに確認します。
+        最初のレコードを返す前のリクエストエラーは表示して終了しますが、
+        途中まで返した後のエラーは、途中で切れた表を完全な表と区別できるよう送出します。
+        """
+        try:
+            response = self._send(
+                'GET', 'getStatsData', "xml", params=params, stream=True)
+        except requests.exceptions.HTTPError as e:
+            print(
+                f"HTTPエラーが発生しました: {e.response.status_code} {e.response.reason}")
+            print(f"レスポンス: {e.response.text}")
+            return
+        except requests.exceptions.RequestException as e:
+            print(f"リクエストエラーが発生しました: {e}")
+            return
+
+        with response:
+            yield from iter_values(self._iter_chunks(response, chunk_size, deadline))
 
-    def post_dataset(self, **kwargs):
+    def post_dataset(self, sink=None, **kwargs):
         """
         2.4. データセット登録 (postDataset)
 
@@ -156,12 +444,14 @@ class EstatAPI:
         このAPIはPOSTリクエストを使用します。レスポンスはXMLまたはJSONです。
 
         Args:
+            sink (str, os.PathLike or writable, optional): 指定した場合、レスポンスを
+                デコードせずに書き込み、メタ情報のみを返します。
             **kwargs: processMode, statsDataId, dataSetName などのパラメータ。
         """
         # このAPIのレスポンス形式はXMLかJSONのみ
-        return self._make_request('POST', 'postDataset', data_format="json", params=kwargs)
+        return self._make_request('POST', 'postDataset', data_format="json", params=kwargs, sink=sink)
 
-    def ref_dataset(self, data_format="json", **kwargs):
+    def ref_dataset(self, data_format="json", sink=None, **kwargs):
         """
         2.5. データセット参照 (refDataset)
 
@@ -169,11 +459,13 @@ class EstatAPI:
 
         Args:
             data_format (str, optional): レスポンス形式 ('json', 'xml', 'jsonp')。CSVは非対応。
+            sink (str, os.PathLike or writable, optional): 指定した場合、レスポンスを
+                デコードせずに書き込み、メタ情報のみを返します。
             **kwargs: dataSetId などのパラメータ。
         """
-        return self._make_request('GET', 'refDataset', data_format, params=kwargs)
+        return self._make_request('GET', 'refDataset', data_format, params=kwargs, sink=sink)
 
-    def get_data_catalog(self, data_format="json", **kwargs):
+    def get_data_catalog(self, data_format="json", sink=None, **kwargs):
         """
         2.6. データカタログ情報取得 (getDataCatalog)
 
@@ -181,11 +473,13 @@ class EstatAPI:
 
         Args:
             data_format (str, optional): レスポンス形式 ('json', 'xml', 'jsonp')。CSVは非対応。
+            sink (str, os.PathLike or writable, optional): 指定した場合、レスポンスを
+                デコードせずに書き込み、メタ情報のみを返します。
             **kwargs: searchWord, dataType, updatedDate などのパラメータ。
         """
-        return self._make_request('GET', 'getDataCatalog', data_format, params=kwargs)
+        return self._make_request('GET', 'getDataCatalog', data_format, params=kwargs, sink=sink)
 
-    def get_stats_datas(self, statsDatasSpec, data_format="json", **kwargs):
+    def get_stats_datas(self, statsDatasSpec, data_format="json", sink=None, **kwargs):
         """
         2.7. 統計データ一括取得 (getStatsDatas)
 
@@ -196,6 +490,8 @@ class EstatAPI:
             statsDatasSpec (list): 取得したい統計データの条件を辞書のリストで指定します。
                                    例: [{"statsDataId": "000..."}, {"dataSetId": "..."}]
             data_format (str, optional): レスポンス形式 ('json', 'xml', 'csv')。
+            sink (str, os.PathLike or writable, optional): 指定した場合、レスポンスを
+                デコードせずに書き込み、メタ情報のみを返します。
             **kwargs: metaGetFlg, explanationGetFlg などの共通パラメータ。
         """
         if not isinstance(statsDatasSpec, list):
@@ -205,4 +501,4 @@ class EstatAPI:
         # リストをJSON文字列に変換します
         params['statsDatasSpec'] = json.dumps(
             statsDatasSpec, ensure_ascii=False)
-        return self._make_request('POST', 'getStatsDatas', data_format, params=params)
+        return self._make_request('POST', 'getStatsDatas', data_format, params=params, sink=sink)
@@ -0,0 +1,229 @@
+"""dataset_manager.py
+
+Register frequently used filter sets as server-side datasets.
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from estat_api.api import EstatAPI
+
+# データセットに含める絞り込み条件のキー接頭辞 (lvTab, cdArea, cdCat01 など)
+FILTER_KEY_PREFIXES: Tuple[str, ...] = ('lv', 'cd')
+
+
+def split_codes(value) -> List[str]:
+    """
+    カンマ区切りの文字列やリストで指定されたコードを、前後の空白を除き、
+    重複を除いて並べ替えたリストに揃えます。
+    """
+    if isinstance(value, (list, tuple, set)):
+        codes = [str(v).strip() for v in value]
+    else:
+        codes = [v.strip() for v in str(value).split(',')]
+    return sorted(set(c for c in codes if c))
+
+
+class DatasetManager:
+    """
+    よく使う絞り込み条件をデータセットとして自動登録するクラス。
+
+    同じ統計表IDと絞り込み条件 (cdArea, cdCat01, cdTime など) の組み合わせが
+    `min_hits` 回以上使われると、postDataset でデータセットとして登録し、
+    以降の getStatsData / getStatsDatas は dataSetId 経由で呼び出します。
+    正規化した絞り込み条件から dataSetId への対応表はローカルに保持し、
+    初回利用時に refDataset で存在を確認します。
+    登録に失敗した絞り込み条件は記録し、同じインスタンスでは再登録を試みません。
+    `path` を指定すると対応表をJSONファイルに保存し、次回以降のプロセスでも
+    同じデータセットを再利用します。
+    """
+
+    def __init__(self, api: EstatAPI, min_hits: int = 2, path: Optional[str] = None):
+        """
+        DatasetManagerクラスのコンストラクタ。
+
+        Args:
+            api (EstatAPI): リクエストに使用する EstatAPI インスタンス。
+            min_hits (int, optional): データセットとして登録するまでの利用回数。デフォルトは 2。
+            path (str, optional): 対応表を保存するJSONファイルのパス。デフォルトは None (保存しない)。
+        """
+        if min_hits < 1:
+            raise ValueError("'min_hits' は1以上である必要があります。")
+        self.api = api
+        self.min_hits = min_hits
+        self.path = path
+        self.mapping: Dict[str, str] = {}
+        self._hits: Dict[str, int] = {}
+        self._verified: set = set()
+        self._failed: set = set()
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def load(self, path: str) -> None:
+        """
+        JSONファイルから対応表を読み込みます。
+
+        読み込んだデータセットIDは、初回利用時に refDataset で存在を確認します。
+        """
+        with open(path, encoding='utf-8') as f:
+            self.mapping.update(json.load(f))
+
+    def save(self, path: Optional[str] = None) -> None:
+        """
+        対応表をJSONファイルに保存します。path を省略した場合はコンストラクタの path を使います。
+        """
+        path = path or self.path
+        if path is None:
+            return
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.mapping, f, ensure_ascii=False, indent=2)
+
+    @staticmethod
+    def split_filters(params: Dict[str, Any]) -> Tuple[Dict[str, str], Dict[str, Any]]:
+        """
+        パラメータを絞り込み条件とそれ以外に分け、絞り込み条件を正規化します。
+
+        カンマ区切りの文字列やリストで指定されたコードは、重複を除いて並べ替え、
+        カンマ区切りの文字列に揃えます。同じデータを選ぶ条件は同じキーになります。
+
+        Returns:
+            tuple: (正規化した絞り込み条件, それ以外のパラメータ)
+        """
+        filters = {}
+        others = {}
+        for key, value in params.items():
+            if key.startswith(FILTER_KEY_PREFIXES):
+                filters[key] = ",".join(split_codes(value))
+            else:
+                others[key] = value
+        return filters, others
+
+    @staticmethod
+    def make_key(stats_data_id: str, filters: Dict[str, str]) -> str:
+        """
+        統計表IDと正規化した絞り込み条件から対応表のキーを作成します。
+        """
+        return json.dumps(
+            {"statsDataId": stats_data_id, "filters": filters},
+            ensure_ascii=False, sort_keys=True
+        )
+
+    def register(self, stats_data_id: str, **filters) -> Optional[str]:
+        """
+        絞り込み条件をデータセットとして登録し、dataSetId を返します。
+
+        既に登録済みの場合は対応表の dataSetId を返します。
+
+        Args:
+            stats_data_id (str): 統計表ID。
+            **filters: cdArea, cdCat01, cdTime などの絞り込み条件。
+
+        Returns:
+            str or None: 登録したデータセットID。登録に失敗した場合は None。
+        """
+        normalized, _ = self.split_filters(filters)
+        key = self.make_key(stats_data_id, normalized)
+        if key in self.mapping:
+            return self.mapping[key]
+
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+        params = dict(normalized)
+        params['processMode'] = 'E'
+        params['statsDataId'] = stats_data_id
+        params['dataSetName'] = f"estat_api_{digest}"
+        response = self.api.post_dataset(**params)
+        dataset_id = self._parse_dataset_id(response)
+        if dataset_id is None:
+            return None
+
+        self.mapping[key] = dataset_id
+        self._verified.add(dataset_id)
+        self.save()
+        return dataset_id
+
+    def resolve(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        getStatsData のパラメータを、可能であれば dataSetId を使う形に書き換えます。
+
+        利用回数が `min_hits` に達した絞り込み条件はこの時点で登録されます。
+        書き換えられない場合はパラメータをそのまま返します。
+        """
+        stats_data_id = params.get('statsDataId')
+        if stats_data_id is None or 'dataSetId' in params:
+            return params
+        filters, others = self.split_filters(params)
+        if not filters:
+            return params
+
+        key = self.make_key(stats_data_id, filters)
+        dataset_id = self.mapping.get(key)
+        if dataset_id is not None and not self._exists(dataset_id):
+            del self.mapping[key]
+            self.save()
+            dataset_id = None
+
+        if dataset_id is None:
+            if key in self._failed:
+                return params
+            self._hits[key] = self._hits.get(key, 0) + 1
+            if self._hits[key] < self.min_hits:
+                return params
+            dataset_id = self.register(stats_data_id, **filters)
+            if dataset_id is None:
+                # 上限到達や不正な条件では何度送っても失敗するため、以降は登録しません
+                self._failed.add(key)
+                return params
+
+        others.pop('statsDataId', None)
+        others['dataSetId'] = dataset_id
+        return others
+
+    def get_stats_data(self, data_format="json", **kwargs):
+        """
+        dataSetId を経由して EstatAPI.get_stats_data を呼び出します。
+        """
+        return self.api.get_stats_data(data_format, **self.resolve(kwargs))
+
+    def get_stats_datas(self, statsDatasSpec: List[Dict[str, Any]], data_format="json", **kwargs):
+        """
+        各条件を dataSetId 経由に書き換えて EstatAPI.get_stats_datas を呼び出します。
+        """
+        if not isinstance(statsDatasSpec, list):
+            raise TypeError("'statsDatasSpec' は辞書のリストである必要があります。")
+        spec = [self.resolve(dict(item)) for item in statsDatasSpec]
+        return self.api.get_stats_datas(spec, data_format, **kwargs)
+
+    def _exists(self, dataset_id: str) -> bool:
+        """
+        refDataset でデータセットが存在するかを確認します。存在を確認できた結果はキャッシュします。
+
+        STATUS が 0 以外の場合のみ存在しないと判断します。通信エラーなどで
+        確認できなかった場合は True を返し、次回の利用時に改めて確認します。
+        """
+        if dataset_id in self._verified:
+            return True
+        response = self.api.ref_dataset(dataSetId=dataset_id)
+        try:
+            status = int(response['REF_DATASET']['RESULT']['STATUS'])
+        except (TypeError, KeyError, ValueError):
+            return True
+        if status != 0:
+            return False
+        self._verified.add(dataset_id)
+        return True
+
+    @staticmethod
+    def _parse_dataset_id(response) -> Optional[str]:
+        """
+        postDataset のレスポンスからデータセットIDを取り出します。
+        """
+        try:
+            body = response['POST_DATASET']
+            if int(body['RESULT']['STATUS']) != 0:
+                print(f"データセットの登録に失敗しました: {body['RESULT'].get('ERROR_MSG')}")
+                return None
+            return body['DATASET_ID']
+        except (TypeError, KeyError, ValueError):
+            return None
@@ -0,0 +1,79 @@
+"""deadline.py
+
+End-to-end deadlines for API requests.
+"""
+
+import time
+from typing import Optional, Tuple, Union
+
+import requests
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """
+    期限を過ぎたためリクエストを送信できないことを表す例外。
+
+    requests のタイムアウト例外として扱われるため、EstatAPI の各メソッドでは
+    他のリクエストエラーと同様に処理されます。
+    """
+
+
+class Deadline:
+    """
+    ジョブ全体または1回の呼び出しに対する期限を表すクラス。
+
+    ページングや再試行をまたいで共有され、各リクエストの接続・読み込み
+    タイムアウトを残り時間以下に切り詰めます。
+    """
+
+    def __init__(self, seconds: float):
+        """
+        Deadlineクラスのコンストラクタ。
+
+        Args:
+            seconds (float): 現在時刻からの期限（秒）。
+        """
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """
+        期限までの残り秒数を返します。期限を過ぎている場合は 0 以下になります。
+        """
+        return self.expires_at - time.monotonic()
+
+    def check(self) -> None:
+        """
+        期限を過ぎている場合に DeadlineExceeded を送出します。
+        """
+        if self.remaining() <= 0:
+            raise DeadlineExceeded("リクエストの期限を過ぎました。")
+
+    def timeout(
+        self,
+        timeout: Union[float, Tuple[float, float]],
+    ) -> Tuple[float, float]:
+        """
+        (接続, 読み込み) タイムアウトを残り時間以下に切り詰めて返します。
+
+        Args:
+            timeout (float or tuple): 元のタイムアウト。数値の場合は接続・読み込みの両方に使います。
+
+        Raises:
+            DeadlineExceeded: 期限を過ぎている場合。
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded("リクエストの期限を過ぎました。")
+        connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        return min(connect, remaining), min(read, remaining)
+
+    @staticmethod
+    def earliest(a: Optional['Deadline'], b: Optional['Deadline']) -> Optional['Deadline']:
+        """
+        2つの期限のうち早い方を返します。
+        """
+        if a is None:
+            return b
+        if b is None:
+            return a
+        return a if a.expires_at <= b.expires_at else b
@@ -0,0 +1,72 @@
+"""decoders.py
+
+Pluggable JSON decoder backends.
+"""
+
+import json
+from typing import Any, Callable, Dict
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# "auto" を指定した場合に試すバックエンドの順序
+AUTO_ORDER = ('orjson', 'msgspec', 'json')
+
+
+def _available() -> Dict[str, Callable[[bytes], Any]]:
+    """
+    利用可能なバックエンド名とデコード関数の対応を返します。
+    """
+    decoders: Dict[str, Callable[[bytes], Any]] = {'json': json.loads}
+    if orjson is not None:
+        decoders['orjson'] = orjson.loads
+    if msgspec is not None:
+        decoders['msgspec'] = msgspec.json.Decoder().decode
+    return decoders
+
+
+def get_decoder(backend: str = "auto") -> Callable[[bytes], Any]:
+    """
+    バイト列をそのままデコードする関数を返します。
+
+    Args:
+        backend (str, optional): 'auto', 'orjson', 'msgspec', 'json' のいずれか。
+                                 'auto' の場合はインストールされている中で最も速いものを使います。
+
+    Raises:
+        ValueError: サポートされていないバックエンド名の場合。
+        ImportError: 指定したバックエンドがインストールされていない場合。
+    """
+    decoders = _available()
+    if backend == "auto":
+        for name in AUTO_ORDER:
+            if name in decoders:
+                return decoders[name]
+    if backend not in AUTO_ORDER:
+        raise ValueError(f"サポートされていないJSONデコーダです: {backend}")
+    if backend not in decoders:
+        raise ImportError(f"JSONデコーダ '{backend}' を使うには {backend} のインストールが必要です。")
+    return decoders[backend]
+
+
+def decode_stats_data(content: bytes):
+    """
+    getStatsData のJSONレスポンスを msgspec の型付き構造体にデコードします。
+
+    Returns:
+        estat_api.structs.StatsDataResponse: デコードした構造体。
+
+    Raises:
+        ImportError: msgspec がインストールされていない場合。
+    """
+    if msgspec is None:
+        raise ImportError("型付きデコードを使うには msgspec のインストールが必要です。")
+    from estat_api.structs import STATS_DATA_DECODER
+    return STATS_DATA_DECODER.decode(content)
@@ -0,0 +1,322 @@
+"""downloader.py
+
+Parallel, resumable download of getDataCatalog file resources.
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from estat_api.api import EstatAPI, TIMEOUT_SEC
+from estat_api.deadline import Deadline, DeadlineExceeded
+
+# 途中までダウンロードしたファイルの拡張子
+PART_SUFFIX: str = ".part"
+# ダウンロード済みファイルの情報を保存するファイルの拡張子
+META_SUFFIX: str = ".meta.json"
+
+
+def _as_list(value) -> list:
+    """
+    JSONレスポンスで単一要素の場合に辞書になる項目をリストに揃えます。
+    """
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+def iter_catalog_resources(api: EstatAPI, **kwargs) -> Iterator[Dict[str, Any]]:
+    """
+    getDataCatalog をページングしながら、各リソース (RESOURCE) を順に返します。
+
+    Args:
+        api (EstatAPI): リクエストに使用する EstatAPI インスタンス。
+        **kwargs: searchWord, dataType, updatedDate などのパラメータ。
+
+    Yields:
+        dict: RESOURCE 要素 (@id, URL, FORMAT, LAST_MODIFIED_DATE など)。
+    """
+    params = dict(kwargs)
+    while True:
+        response = api.get_data_catalog(**params)
+        try:
+            list_inf = response['GET_DATA_CATALOG']['DATA_CATALOG_LIST_INF']
+        except (TypeError, KeyError):
+            return
+        for catalog in _as_list(list_inf.get('DATA_CATALOG_INF')):
+            resources = (catalog.get('RESOURCES') or {}).get('RESOURCE')
+            yield from _as_list(resources)
+
+        next_key = (list_inf.get('RESULT_INF') or {}).get('NEXT_KEY')
+        if next_key is None:
+            return
+        params['startPosition'] = next_key
+
+
+def resource_filename(resource: Dict[str, Any]) -> str:
+    """
+    リソースの保存ファイル名を決めます。
+
+    e-Stat のファイルURLはクエリ文字列でファイルを指定するため、
+    リソースIDと FORMAT から名前を作り、無い場合はURLの末尾を使います。
+    """
+    res_id = resource.get('@id')
+    fmt = resource.get('FORMAT')
+    if res_id and fmt:
+        return f"{res_id}.{str(fmt).lower()}"
+    if res_id:
+        return str(res_id)
+    return os.path.basename(urlparse(resource['URL']).path)
+
+
+def download_catalog_resources(
+    api: EstatAPI,
+    dest_dir: str,
+    max_workers: int = 4,
+    chunk_size: int = 1 << 16,
+    session: Optional[requests.Session] = None,
+    **kwargs
+) -> List[Dict[str, Any]]:
+    """
+    データカタログのリソースファイルを並列にダウンロードします。
+
+    - 各ファイルはチャンク単位で直接ディスクに書き込みます。
+    - 途中まで保存された `.part` ファイルは HTTP Range と If-Range で続きから取得します。
+    - 前回保存時から最終更新日が変わらず、HEAD で確認したサーバ側のサイズと
+      ETag / Last-Modified が一致するファイルはスキップします。
+    - カタログのページングと並行して、取得済みのリソースからダウンロードを始めます。
+    - api.deadline のブロック内で呼び出した場合、その期限を各ダウンロードにも適用します。
+
+    Args:
+        api (EstatAPI): リクエストに使用する EstatAPI インスタンス。
+        dest_dir (str): 保存先ディレクトリ。
+        max_workers (int, optional): 同時ダウンロード数。デフォルトは 4。
+        chunk_size (int, optional): 1回に書き込むバイト数。デフォルトは 65536。
+        session (requests.Session, optional): 使用するセッション。省略時は
+                                              max_workers 本の接続プールを持つセッションを作成します。
+        **kwargs: getDataCatalog に渡す searchWord, dataType などのパラメータ。
+
+    Returns:
+        list: 各リソースの結果 {"id", "url", "path", "status", "bytes"} のリスト。
+              status は 'downloaded', 'resumed', 'skipped', 'failed' のいずれか。
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    own_session = session is None
+    if own_session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # 次のページを取得している間も、取得済みのリソースのダウンロードを進めます
+            futures = [
+                executor.submit(download_resource, session, r, dest_dir, chunk_size,
+                                api.timeout, api.current_deadline())
+                for r in iter_catalog_resources(api, **kwargs) if r.get('URL')
+            ]
+            return [f.result() for f in futures]
+    finally:
+        if own_session:
+            session.close()
+
+
+def download_resource(
+    session: requests.Session,
+    resource: Dict[str, Any],
+    dest_dir: str,
+    chunk_size: int = 1 << 16,
+    timeout=TIMEOUT_SEC,
+    deadline: Optional[Deadline] = None,
+) -> Dict[str, Any]:
+    """
+    1件のリソースをダウンロードします。
+
+    `.part` ファイルには取得開始時の LAST_MODIFIED_DATE と ETag / Last-Modified を
+    記録し、再開時は If-Range を付けて送ります。カタログの最終更新日が変わった
+    場合や、サーバ側でファイルが更新された場合は `.part` を破棄して最初から取得します。
+    保存済みのファイルは HEAD でサーバ側のサイズと ETag / Last-Modified を確認し、
+    変わっていない場合のみスキップします。
+    ネットワークやディスクのエラーは例外にせず、status='failed' として返します。
+
+    timeout にはタイムアウト秒数、または (接続, 読み込み) の組を指定します。
+    deadline を指定した場合は、各リクエストのタイムアウトを残り時間以下に切り詰め、
+    チャンクを書き込むたびに期限を確認します。期限を過ぎた場合も status='failed' です。
+
+    Returns:
+        dict: 結果 {"id", "url", "path", "status", "bytes"}。
+    """
+    url = resource['URL']
+    path = os.path.join(dest_dir, resource_filename(resource))
+    part_path = path + PART_SUFFIX
+    last_modified = resource.get('LAST_MODIFIED_DATE')
+    result = {"id": resource.get('@id'), "url": url, "path": path,
+              "status": "failed", "bytes": 0}
+
+    try:
+        meta = _read_meta(path)
+        if (meta is not None and os.path.exists(path)
+                and meta.get('size') == os.path.getsize(path)
+                and _is_unchanged(session, url, meta, last_modified, timeout, deadline)):
+            result['status'] = 'skipped'
+            result['bytes'] = meta['size']
+            return result
+
+        status = _fetch_to_part(
+            session, url, part_path, last_modified, chunk_size, timeout, deadline)
+        if status is None:
+            # 416 で取得済みサイズが一致しなかった場合は最初から取り直します
+            _discard_part(part_path)
+            status = _fetch_to_part(
+                session, url, part_path, last_modified, chunk_size, timeout, deadline)
+        if status is None:
+            print(f"ダウンロードに失敗しました: {url} 範囲指定が受け付けられませんでした")
+            return result
+
+        part_meta = _read_meta(part_path) or {}
+        os.replace(part_path, path)
+        _discard_part(part_path)
+        size = os.path.getsize(path)
+        _write_meta(path, {
+            "url": url,
+            "last_modified": last_modified,
+            "etag": part_meta.get('etag'),
+            "http_last_modified": part_meta.get('http_last_modified'),
+            "size": size,
+        })
+    except (requests.exceptions.RequestException, OSError) as e:
+        print(f"ダウンロードに失敗しました: {url} {e}")
+        return result
+
+    result['status'] = status
+    result['bytes'] = size
+    return result
+
+
+def _clamp(timeout, deadline):
+    """
+    期限がある場合にタイムアウトを残り時間以下に切り詰めます。
+    """
+    return timeout if deadline is None else deadline.timeout(timeout)
+
+
+def _is_unchanged(session, url, meta, last_modified, timeout, deadline=None) -> bool:
+    """
+    保存済みのファイルがサーバ側のファイルと同じかを確認します。
+
+    カタログの最終更新日が変わっていれば HEAD を送らずに False を返します。
+    HEAD の Content-Length が保存時のサイズと異なる場合や、ETag / Last-Modified が
+    変わった場合も False です。HEAD に失敗した場合や比較できる値が無い場合は、
+    カタログの最終更新日で確認できたときのみ True を返します。
+    """
+    if meta.get('last_modified') != last_modified:
+        return False
+    try:
+        response = session.head(url, timeout=_clamp(timeout, deadline), allow_redirects=True)
+        response.raise_for_status()
+    except DeadlineExceeded:
+        raise
+    except requests.exceptions.RequestException:
+        return last_modified is not None
+
+    confirmed = last_modified is not None
+    length = response.headers.get('Content-Length')
+    if length is not None:
+        if str(length) != str(meta.get('size')):
+            return False
+        confirmed = True
+    for header, key in (('ETag', 'etag'), ('Last-Modified', 'http_last_modified')):
+        value = response.headers.get(header)
+        if value is not None and meta.get(key) is not None:
+            if value != meta[key]:
+                return False
+            confirmed = True
+    return confirmed
+
+
+def _fetch_to_part(
+    session, url, part_path, last_modified, chunk_size, timeout, deadline=None
+) -> Optional[str]:
+    """
+    リソースを `.part` ファイルに取得します。
+
+    Returns:
+        str or None: 'downloaded' または 'resumed'。416 が返り、`.part` が完全か
+                     確認できなかった場合は None。
+    """
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    part_meta = _read_meta(part_path) if offset else None
+    if offset and (part_meta is None or part_meta.get('last_modified') != last_modified):
+        # 取得開始時とカタログの最終更新日が異なる `.part` は使えません
+        _discard_part(part_path)
+        offset, part_meta = 0, None
+
+    headers = {}
+    if offset:
+        headers['Range'] = f"bytes={offset}-"
+        validator = part_meta.get('etag') or part_meta.get('http_last_modified')
+        if validator:
+            headers['If-Range'] = validator
+
+    with session.get(url, headers=headers, stream=True,
+                     timeout=_clamp(timeout, deadline)) as response:
+        if response.status_code == 416 and offset:
+            # Content-Range: bytes */<全体サイズ> が手元のサイズと一致すれば取得済みです
+            content_range = response.headers.get('Content-Range', '')
+            if content_range.rsplit('/', 1)[-1] == str(offset):
+                return 'resumed'
+            return None
+
+        response.raise_for_status()
+        if response.status_code == 206 and offset:
+            status, mode = 'resumed', 'ab'
+        else:
+            # 200 の場合は If-Range の不一致などで全体が返っています
+            status, mode = 'downloaded', 'wb'
+            _write_meta(part_path, {
+                "last_modified": last_modified,
+                "etag": response.headers.get('ETag'),
+                "http_last_modified": response.headers.get('Last-Modified'),
+            })
+        with open(part_path, mode) as f:
+            for chunk in response.iter_content(chunk_size):
+                if deadline is not None:
+                    deadline.check()
+                f.write(chunk)
+    return status
+
+
+def _discard_part(part_path: str) -> None:
+    """
+    `.part` ファイルとその情報ファイルを削除します。
+    """
+    for p in (part_path, part_path + META_SUFFIX):
+        if os.path.exists(p):
+            os.remove(p)
+
+
+def _read_meta(path: str) -> Optional[Dict[str, Any]]:
+    """
+    ダウンロード済みファイルの情報を読み込みます。
+    """
+    try:
+        with open(path + META_SUFFIX, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(path: str, meta: Dict[str, Any]) -> None:
+    """
+    ダウンロード済みファイルの情報を保存します。
+    """
+    with open(path + META_SUFFIX, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
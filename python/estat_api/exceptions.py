@@ -0,0 +1,19 @@
+"""exceptions.py
+
+Exceptions raised by the e-Stat API wrapper.
+"""
+
+
+class EstatAPIError(Exception):
+    """
+    e-Stat API が RESULT の STATUS に 0 以外を返したことを表す例外。
+
+    Attributes:
+        status (int): RESULT の STATUS の値。
+        error_msg (str): RESULT の ERROR_MSG の値。
+    """
+
+    def __init__(self, status: int, error_msg: str = ""):
+        super().__init__(f"e-Stat APIがエラーを返しました: STATUS={status} {error_msg}")
+        self.status = status
+        self.error_msg = error_msg
@@ -0,0 +1,168 @@
+"""hedging.py
+
+Hedged requests for tail-latency control.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, Optional
+
+
+class HedgePolicy:
+    """
+    ヘッジリクエストの方針と計測値を管理するクラス。
+
+    直近のレイテンシの `percentile` パーセンタイルを過ぎても応答がない場合、
+    同じ冪等な GET リクエストをもう1本送り、先に返った方を採用します。
+    ヘッジの送信数はリクエスト全体の `max_rate` 以下に抑えます。
+
+    レイテンシはエンドポイントのパスごとに記録します。元のリクエストは
+    呼び出しごとのスレッドで実行し、ヘッジだけを `max_workers` 本の
+    スレッドプールで実行します。負けたリクエストは中断できないため、
+    プールが埋まっている間は新しいヘッジを送りません。
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        max_rate: float = 0.05,
+        min_samples: int = 20,
+        window: int = 200,
+        max_workers: int = 4,
+    ):
+        """
+        HedgePolicyクラスのコンストラクタ。
+
+        Args:
+            percentile (float, optional): ヘッジを送るまでの待ち時間に使うパーセンタイル。デフォルトは 95.0。
+            max_rate (float, optional): リクエスト数に対するヘッジ数の上限割合。デフォルトは 0.05。
+            min_samples (int, optional): ヘッジを始めるまでに必要な計測数。デフォルトは 20。
+            window (int, optional): パスごとにパーセンタイルの計算に使う直近の計測数。デフォルトは 200。
+            max_workers (int, optional): 同時に実行するヘッジの上限数。デフォルトは 4。
+        """
+        if not 0 < percentile <= 100:
+            raise ValueError("'percentile' は 0 より大きく 100 以下である必要があります。")
+        if not 0 <= max_rate <= 1:
+            raise ValueError("'max_rate' は 0 以上 1 以下である必要があります。")
+        self.percentile = percentile
+        self.max_rate = max_rate
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        self.window = window
+        self.requests = 0
+        self.hedges = 0
+        self._hedges_in_flight = 0
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def delay(self, key: str = "") -> Optional[float]:
+        """
+        ヘッジを送るまでの待ち時間（秒）を返します。計測数が足りない場合は None。
+
+        Args:
+            key (str, optional): レイテンシを区別するキー（エンドポイントのパスなど）。
+        """
+        with self._lock:
+            latencies = self._latencies.get(key, ())
+            if len(latencies) < self.min_samples:
+                return None
+            latencies = sorted(latencies)
+        index = min(len(latencies) - 1, int(len(latencies) * self.percentile / 100))
+        return latencies[index]
+
+    def record(self, latency: float, key: str = "") -> None:
+        """
+        1回のリクエストのレイテンシを記録します。
+        """
+        with self._lock:
+            if key not in self._latencies:
+                self._latencies[key] = deque(maxlen=self.window)
+            self._latencies[key].append(latency)
+
+    def run(self, func: Callable[[], object], key: str = ""):
+        """
+        必要に応じてヘッジしながら func を実行し、先に成功した結果を返します。
+
+        両方が失敗した場合は最後の例外を送出します。
+
+        Args:
+            func (callable): 冪等なリクエストを送る関数。
+            key (str, optional): レイテンシを区別するキー（エンドポイントのパスなど）。
+        """
+        with self._lock:
+            self.requests += 1
+        delay = self.delay(key)
+        start = time.perf_counter()
+        if delay is None:
+            result = func()
+            self.record(time.perf_counter() - start, key)
+            return result
+
+        primary: Future = Future()
+        threading.Thread(target=_run_into, args=(func, primary), daemon=True).start()
+        pending = {primary}
+        done, _ = wait(pending, timeout=delay)
+        if not done and self._acquire_hedge():
+            hedge = self._get_executor().submit(func)
+            hedge.add_done_callback(self._release_hedge)
+            pending.add(hedge)
+
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self.record(time.perf_counter() - start, key)
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def close(self) -> None:
+        """
+        ヘッジ用のスレッドプールを終了します。
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _acquire_hedge(self) -> bool:
+        """
+        ヘッジ数の上限割合と同時実行数に収まる場合にヘッジ1回分を確保します。
+        """
+        with self._lock:
+            if self.hedges + 1 > self.max_rate * self.requests:
+                return False
+            if self._hedges_in_flight >= self.max_workers:
+                return False
+            self.hedges += 1
+            self._hedges_in_flight += 1
+            return True
+
+    def _release_hedge(self, _future) -> None:
+        """
+        完了したヘッジの同時実行数を戻します。
+        """
+        with self._lock:
+            self._hedges_in_flight -= 1
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """
+        ヘッジ用のスレッドプールを返します。
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+
+def _run_into(func: Callable[[], object], future: Future) -> None:
+    """
+    func を実行し、結果または例外を future に設定します。
+    """
+    try:
+        future.set_result(func())
+    except BaseException as e:  # pylint: disable=broad-except
+        future.set_exception(e)
@@ -0,0 +1,254 @@
+"""local_query.py
+
+Answer filtered getStatsData calls from a locally indexed full table.
+"""
+
+import copy
+from typing import Any, Dict, List, Optional, Set
+
+from estat_api.api import EstatAPI
+from estat_api.dataset_manager import split_codes
+from estat_api.pager import MAX_LIMIT
+from estat_api.parameters.stats_data import StatsDataParameters
+
+# 絞り込み条件のパラメータ名と VALUE の属性名の対応 (cdCat01〜cdCat15 は別途変換)
+DIMENSION_KEYS: Dict[str, str] = {
+    'cdTab': '@tab',
+    'cdTime': '@time',
+    'cdArea': '@area',
+}
+# ローカルで扱えるページング関連のパラメータ
+PAGING_KEYS = ('startPosition', 'limit')
+
+
+def _dimension_of(key: str) -> Optional[str]:
+    """
+    cdArea, cdCat01 などのパラメータ名を VALUE の属性名に変換します。
+
+    範囲指定 (cdTimeFrom など) や階層指定 (lvArea など) は対象外で None を返します。
+    """
+    if key in DIMENSION_KEYS:
+        return DIMENSION_KEYS[key]
+    if key.startswith('cdCat') and key[5:].isdigit():
+        return f"@cat{key[5:]}"
+    return None
+
+
+def params_to_kwargs(params: StatsDataParameters) -> Dict[str, Any]:
+    """
+    StatsDataParameters を getStatsData のキーワード引数に変換します。
+    """
+    kwargs: Dict[str, Any] = {'statsDataId': params.stats_data_id}
+    optional = {
+        'startPosition': params.start_position,
+        'limit': params.limit,
+        'cdArea': params.cd_area,
+        'cdTime': params.cd_time,
+        'cdTab': params.cd_tab,
+    }
+    kwargs.update({k: v for k, v in optional.items() if v is not None})
+    kwargs['metaGetFlg'] = params.meta_get_flg
+    kwargs['cntGetFlg'] = params.cnt_get_flg
+    kwargs.update(params.cd_cat)
+    return kwargs
+
+
+class _IndexedTable:
+    """
+    統計表全体の VALUE と、次元ごとのコード索引を保持する内部クラス。
+    """
+
+    def __init__(self, envelope: Dict[str, Any], values: List[Dict[str, Any]]):
+        self.envelope = envelope
+        self.values = values
+        self.index: Dict[str, Dict[str, List[int]]] = {}
+        for i, value in enumerate(values):
+            for attr, code in value.items():
+                if attr.startswith('@') and attr != '@unit':
+                    self.index.setdefault(attr, {}).setdefault(code, []).append(i)
+
+    def select(self, filters: Dict[str, List[str]]) -> List[int]:
+        """
+        各次元の索引の積集合を取り、条件に合う行番号を昇順で返します。
+        """
+        selected: Optional[Set[int]] = None
+        # 候補の少ない次元から積集合を取ります
+        candidates = []
+        for attr, codes in filters.items():
+            by_code = self.index.get(attr, {})
+            rows: Set[int] = set()
+            for code in codes:
+                rows.update(by_code.get(code, ()))
+            candidates.append(rows)
+        for rows in sorted(candidates, key=len):
+            selected = rows if selected is None else selected & rows
+            if not selected:
+                break
+        if selected is None:
+            return list(range(len(self.values)))
+        return sorted(selected)
+
+
+class LocalStatsDataEngine:
+    """
+    統計表全体をローカルに取得・索引化し、絞り込み付きの getStatsData に
+    ネットワーク通信なしで応答するクラス。
+
+    ある statsDataId への最初の呼び出しで表全体を取得し、tab, time, area,
+    cat01〜cat15 ごとのコード索引を作成します。以降の同じ表への呼び出しは
+    索引の積集合で答え、EstatAPI.get_stats_data と同じ形のJSONを返します。
+    範囲指定 (cdTimeFrom など) や階層指定 (lvArea など) を含む呼び出し、
+    JSON以外のデータ形式は EstatAPI にそのまま委譲します。
+    """
+
+    def __init__(self, api: EstatAPI, page_limit: int = MAX_LIMIT):
+        """
+        LocalStatsDataEngineクラスのコンストラクタ。
+
+        Args:
+            api (EstatAPI): リクエストに使用する EstatAPI インスタンス。
+            page_limit (int, optional): 表全体を取得する際の1ページの件数。デフォルトは MAX_LIMIT。
+        """
+        self.api = api
+        self.page_limit = page_limit
+        self.tables: Dict[str, _IndexedTable] = {}
+
+    def get_stats_data(
+        self,
+        data_format="json",
+        params: Optional[StatsDataParameters] = None,
+        **kwargs
+    ):
+        """
+        2.3. 統計データ取得 (getStatsData) をローカルの索引から返します。
+
+        EstatAPI.get_stats_data と同じ引数で呼び出せます。第1引数に
+        StatsDataParameters を渡した場合は params として扱います。
+
+        Args:
+            data_format (str, optional): レスポンス形式。'json' 以外は API に委譲します。
+            params (StatsDataParameters, optional): 取得条件。指定した場合は kwargs より優先します。
+            **kwargs: statsDataId と cdArea, cdTime, cdTab, cdCat01 などの絞り込み条件。
+
+        Returns:
+            dict: getStatsData と同じ形のJSONレスポンス。取得に失敗した場合は None。
+        """
+        if isinstance(data_format, StatsDataParameters):
+            params, data_format = data_format, "json"
+        if params is not None:
+            kwargs = params_to_kwargs(params)
+        stats_data_id = kwargs.get('statsDataId')
+        if data_format != "json" or stats_data_id is None or 'dataSetId' in kwargs:
+            return self.api.get_stats_data(data_format, **kwargs)
+
+        filters: Dict[str, List[str]] = {}
+        for key, value in kwargs.items():
+            if key in ('statsDataId', 'metaGetFlg', 'cntGetFlg', 'lang') or key in PAGING_KEYS:
+                continue
+            attr = _dimension_of(key)
+            if attr is None:
+                return self.api.get_stats_data(data_format, **kwargs)
+            filters[attr] = split_codes(value)
+
+        table = self.load(stats_data_id, lang=kwargs.get('lang'))
+        if table is None:
+            return None
+        rows = table.select(filters)
+        return self._build_response(table, rows, kwargs)
+
+    def load(self, stats_data_id: str, lang: Optional[str] = None) -> Optional[_IndexedTable]:
+        """
+        統計表全体を取得して索引化します。既に取得済みの場合はそれを返します。
+        """
+        cache_key = stats_data_id if lang is None else f"{stats_data_id}:{lang}"
+        if cache_key in self.tables:
+            return self.tables[cache_key]
+
+        params: Dict[str, Any] = {'statsDataId': stats_data_id, 'limit': self.page_limit}
+        if lang is not None:
+            params['lang'] = lang
+        envelope = None
+        values: List[Dict[str, Any]] = []
+        while True:
+            page = self.api.get_stats_data(**params)
+            try:
+                statistical_data = page['GET_STATS_DATA']['STATISTICAL_DATA']
+            except (TypeError, KeyError):
+                return None
+            if envelope is None:
+                envelope = page
+            page_values = statistical_data.get('DATA_INF', {}).get('VALUE', [])
+            if isinstance(page_values, dict):
+                page_values = [page_values]
+            values.extend(page_values)
+
+            next_key = statistical_data.get('RESULT_INF', {}).get('NEXT_KEY')
+            if next_key is None:
+                break
+            params['startPosition'] = next_key
+            # メタ情報 (CLASS_INF) は1ページ目で取得済みです
+            params['metaGetFlg'] = 'N'
+
+        table = _IndexedTable(envelope, values)
+        self.tables[cache_key] = table
+        return table
+
+    def clear(self, stats_data_id: Optional[str] = None) -> None:
+        """
+        取得済みの表を破棄します。statsDataId を省略した場合はすべて破棄します。
+        """
+        if stats_data_id is None:
+            self.tables.clear()
+            return
+        for key in [k for k in self.tables if k.split(':')[0] == stats_data_id]:
+            del self.tables[key]
+
+    @staticmethod
+    def _build_response(table: _IndexedTable, rows: List[int], kwargs: Dict[str, Any]):
+        """
+        選択した行から getStatsData と同じ形のレスポンスを作成します。
+
+        返す辞書はすべてキャッシュした表のコピーなので、呼び出し側で書き換えても
+        以降の応答には影響しません。
+        """
+        total = len(rows)
+        start = int(kwargs.get('startPosition', 1))
+        end = total if kwargs.get('limit') is None else start - 1 + int(kwargs['limit'])
+        page_rows = rows[start - 1:end]
+
+        # 表全体の VALUE は選択した行だけを後でコピーします
+        envelope = table.envelope['GET_STATS_DATA']
+        envelope_data = envelope['STATISTICAL_DATA']
+        skip = {'DATA_INF'}
+        if kwargs.get('metaGetFlg') == 'N':
+            skip.add('CLASS_INF')
+        response = {k: copy.deepcopy(v) for k, v in table.envelope.items()
+                    if k != 'GET_STATS_DATA'}
+        body = {k: copy.deepcopy(v) for k, v in envelope.items() if k != 'STATISTICAL_DATA'}
+        statistical_data = {k: copy.deepcopy(v) for k, v in envelope_data.items()
+                            if k not in skip}
+        result_inf = statistical_data.get('RESULT_INF', {})
+        data_inf = {k: copy.deepcopy(v) for k, v in envelope_data.get('DATA_INF', {}).items()
+                    if k != 'VALUE'}
+
+        result_inf['TOTAL_NUMBER'] = total
+        result_inf['FROM_NUMBER'] = start if page_rows else 0
+        result_inf['TO_NUMBER'] = start - 1 + len(page_rows) if page_rows else 0
+        result_inf.pop('NEXT_KEY', None)
+        if start - 1 + len(page_rows) < total:
+            result_inf['NEXT_KEY'] = start + len(page_rows)
+        if kwargs.get('cntGetFlg') == 'Y':
+            # 件数のみを返します
+            data_inf = None
+            result_inf.pop('NEXT_KEY', None)
+        else:
+            data_inf['VALUE'] = [dict(table.values[i]) for i in page_rows]
+
+        statistical_data['RESULT_INF'] = result_inf
+        if data_inf is None:
+            statistical_data.pop('DATA_INF', None)
+        else:
+            statistical_data['DATA_INF'] = data_inf
+        body['STATISTICAL_DATA'] = statistical_data
+        response['GET_STATS_DATA'] = body
+        return response
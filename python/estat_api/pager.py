@@ -0,0 +1,203 @@
+"""pager.py
+
+Adaptive pagination for getStatsData.
+"""
+
+from typing import Any, Dict, Iterator, List, Optional
+
+import requests
+from urllib3.exceptions import ReadTimeoutError
+
+from estat_api.api import EstatAPI
+from estat_api.deadline import DeadlineExceeded
+
+# e-Stat API で一度に取得できる最大件数
+MAX_LIMIT: int = 100000
+
+
+def _is_timeout(error: requests.exceptions.RequestException) -> bool:
+    """
+    例外がタイムアウトによるものかを判定します。
+
+    本文の読み込み中に読み込みタイムアウトした場合、requests は ReadTimeoutError を
+    ConnectionError で包んで送出するため、それもタイムアウトとして扱います。
+    """
+    if isinstance(error, requests.exceptions.Timeout):
+        return True
+    return (isinstance(error, requests.exceptions.ConnectionError)
+            and any(isinstance(arg, ReadTimeoutError) for arg in error.args))
+
+
+class AdaptivePager:
+    """
+    計測したレイテンシとペイロードサイズに基づいて limit を自動調整するページャ。
+
+    最初のページで1行あたりの秒数とバイト数を計測し、cntGetFlg で得た総件数を
+    上限として、以降のページが `target_sec` 秒前後で返るように limit を選びます。
+    タイムアウトした場合は limit を半分にして同じ位置から再取得します。
+    """
+
+    def __init__(
+        self,
+        api: EstatAPI,
+        target_sec: float = 5.0,
+        initial_limit: int = 1000,
+        min_limit: int = 100,
+        max_limit: int = MAX_LIMIT,
+        max_page_bytes: Optional[int] = None,
+        max_retries: int = 3,
+        smoothing: float = 0.5,
+    ):
+        """
+        AdaptivePagerクラスのコンストラクタ。
+
+        Args:
+            api (EstatAPI): リクエストに使用する EstatAPI インスタンス。
+            target_sec (float, optional): 1ページあたりの目標レイテンシ（秒）。デフォルトは 5.0。
+            initial_limit (int, optional): 最初のページの取得件数。デフォルトは 1000。
+            min_limit (int, optional): limit の下限。デフォルトは 100。
+            max_limit (int, optional): limit の上限。デフォルトは MAX_LIMIT。
+            max_page_bytes (int, optional): 1ページあたりの目標バイト数の上限。デフォルトは None (制限なし)。
+            max_retries (int, optional): タイムアウト時に縮小して再試行する回数。デフォルトは 3。
+            smoothing (float, optional): 計測値の指数移動平均の重み (0 < smoothing <= 1)。デフォルトは 0.5。
+        """
+        if not 0 < min_limit <= initial_limit <= max_limit:
+            raise ValueError("'min_limit' <= 'initial_limit' <= 'max_limit' である必要があります。")
+        if not 0 < smoothing <= 1:
+            raise ValueError("'smoothing' は 0 より大きく 1 以下である必要があります。")
+        self.api = api
+        self.target_sec = target_sec
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_page_bytes = max_page_bytes
+        self.max_retries = max_retries
+        self.smoothing = smoothing
+        self.sec_per_row: Optional[float] = None
+        self.bytes_per_row: Optional[float] = None
+        self.history: List[Dict[str, Any]] = []
+
+    def count(self, **kwargs) -> Optional[int]:
+        """
+        cntGetFlg='Y' で統計データの総件数を取得します。
+        """
+        params = dict(kwargs)
+        params['cntGetFlg'] = 'Y'
+        response = self.api.get_stats_data(**params)
+        try:
+            result_inf = response['GET_STATS_DATA']['STATISTICAL_DATA']['RESULT_INF']
+            return int(result_inf['TOTAL_NUMBER'])
+        except (TypeError, KeyError, ValueError):
+            return None
+
+    def iter_pages(self, **kwargs) -> Iterator[Dict[str, Any]]:
+        """
+        limit を調整しながら getStatsData の各ページを順に返します。
+
+        Args:
+            **kwargs: statsDataId または dataSetId と絞り込み条件。
+                      startPosition を指定した場合はその位置から取得します。
+
+        Yields:
+            dict: 各ページの JSON レスポンス。
+
+        Raises:
+            ValueError: statsDataId と dataSetId がない場合、またはレスポンスをデコードできない場合。
+            requests.exceptions.HTTPError: HTTPエラーの場合。
+            requests.exceptions.RequestException: limit を縮小しても再試行回数を超えてタイムアウトした場合、
+                                                  またはタイムアウト以外の接続エラーの場合。
+            DeadlineExceeded: EstatAPI.deadline で設定した期限を過ぎた場合。
+        """
+        if 'statsDataId' not in kwargs and 'dataSetId' not in kwargs:
+            raise ValueError("'statsDataId' または 'dataSetId' のいずれか一つは必須です。")
+        params = dict(kwargs)
+        params.pop('limit', None)
+        params.pop('cntGetFlg', None)
+        position = int(params.pop('startPosition', 1))
+        total = self.count(**params)
+        limit = self.initial_limit
+
+        while True:
+            if total is not None:
+                remaining = total - position + 1
+                if remaining <= 0:
+                    return
+                limit = min(limit, remaining)
+            page, limit = self._fetch(params, position, limit)
+            yield page
+
+            try:
+                result_inf = page['GET_STATS_DATA']['STATISTICAL_DATA']['RESULT_INF']
+            except (TypeError, KeyError):
+                return
+            if 'NEXT_KEY' not in result_inf:
+                return
+            position = int(result_inf['NEXT_KEY'])
+            limit = self.next_limit()
+
+    def next_limit(self) -> int:
+        """
+        これまでの計測値から次のページの limit を計算します。
+        """
+        if not self.sec_per_row:
+            return self.initial_limit
+        limit = self.target_sec / self.sec_per_row
+        if self.max_page_bytes and self.bytes_per_row:
+            limit = min(limit, self.max_page_bytes / self.bytes_per_row)
+        return max(self.min_limit, min(self.max_limit, int(limit)))
+
+    def _fetch(self, params, position, limit):
+        """
+        1ページを取得し、計測値を更新します。タイムアウト時は limit を縮小して再試行します。
+
+        Returns:
+            tuple: (JSON レスポンス, 実際に使用した limit)
+        """
+        retries = 0
+        while True:
+            page_params = dict(params)
+            page_params['startPosition'] = position
+            page_params['limit'] = limit
+            try:
+                response, elapsed = self.api.fetch_stats_data("json", **page_params)
+            except DeadlineExceeded:
+                # ジョブ全体の期限切れは limit を縮めても解消しません
+                raise
+            except requests.exceptions.RequestException as e:
+                if not _is_timeout(e):
+                    raise
+                if retries >= self.max_retries or limit <= self.min_limit:
+                    raise
+                retries += 1
+                limit = max(self.min_limit, limit // 2)
+                # タイムアウトは目標を大きく超えた証拠なので推定値も悲観側に寄せます
+                if self.sec_per_row:
+                    self.sec_per_row *= 2
+                continue
+            page = self.api.decode(response, "json")
+            self._observe(page, limit, len(response.content), elapsed)
+            return page, limit
+
+    def _observe(self, page, limit, n_bytes, elapsed):
+        """
+        取得したページの行数・バイト数・秒数から1行あたりの推定値を更新します。
+        """
+        rows = limit
+        try:
+            result_inf = page['GET_STATS_DATA']['STATISTICAL_DATA']['RESULT_INF']
+            rows = int(result_inf['TO_NUMBER']) - int(result_inf['FROM_NUMBER']) + 1
+        except (TypeError, KeyError, ValueError):
+            pass
+        rows = max(rows, 1)
+        self.history.append(
+            {"limit": limit, "rows": rows, "bytes": n_bytes, "elapsed": elapsed})
+
+        alpha = self.smoothing
+        sec_per_row = elapsed / rows
+        bytes_per_row = n_bytes / rows
+        if self.sec_per_row is None:
+            self.sec_per_row = sec_per_row
+            self.bytes_per_row = bytes_per_row
+        else:
+            self.sec_per_row = alpha * sec_per_row + (1 - alpha) * self.sec_per_row
+            self.bytes_per_row = alpha * bytes_per_row + (1 - alpha) * self.bytes_per_row
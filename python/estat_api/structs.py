@@ -0,0 +1,68 @@
+"""structs.py
+
+Typed msgspec structs for the getStatsData response envelope.
+
+This module requires msgspec.
+"""
+
+from typing import Any, List, Optional, Union
+
+import msgspec
+
+# cat01〜cat15 を含む VALUE の属性名
+_VALUE_ATTRS = ['tab', 'time', 'area', 'unit'] + [f"cat{i:02d}" for i in range(1, 16)]
+
+# VALUE 要素。属性は '@tab' などのキー、値は '$' キーに対応します。
+Value = msgspec.defstruct(
+    "Value",
+    [(name, Optional[str], None) for name in _VALUE_ATTRS] + [("value", Optional[str], None)],
+    rename=lambda name: "$" if name == "value" else f"@{name}",
+)
+
+
+class Result(msgspec.Struct):
+    """RESULT 要素"""
+    STATUS: int
+    ERROR_MSG: Optional[str] = None
+    DATE: Optional[str] = None
+
+
+class ResultInf(msgspec.Struct):
+    """RESULT_INF 要素"""
+    TOTAL_NUMBER: int
+    FROM_NUMBER: Optional[int] = None
+    TO_NUMBER: Optional[int] = None
+    NEXT_KEY: Optional[int] = None
+
+
+class DataInf(msgspec.Struct):
+    """DATA_INF 要素。VALUE が1件の場合も配列として扱います。"""
+    NOTE: Any = None
+    VALUE: Union[List[Value], Value] = []
+
+    def __post_init__(self):
+        if not isinstance(self.VALUE, list):
+            self.VALUE = [self.VALUE]
+
+
+class StatisticalData(msgspec.Struct):
+    """STATISTICAL_DATA 要素"""
+    RESULT_INF: Optional[ResultInf] = None
+    TABLE_INF: Any = None
+    CLASS_INF: Any = None
+    DATA_INF: Optional[DataInf] = None
+
+
+class GetStatsData(msgspec.Struct):
+    """GET_STATS_DATA 要素"""
+    RESULT: Result
+    PARAMETER: Any = None
+    STATISTICAL_DATA: Optional[StatisticalData] = None
+
+
+class StatsDataResponse(msgspec.Struct):
+    """getStatsData のJSONレスポンス全体"""
+    GET_STATS_DATA: GetStatsData
+
+
+STATS_DATA_DECODER = msgspec.json.Decoder(StatsDataResponse, strict=False)
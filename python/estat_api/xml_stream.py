@@ -0,0 +1,72 @@
+"""xml_stream.py
+
+Incremental decoding of XML responses.
+"""
+
+from typing import Any, Dict, Iterable, Iterator
+from xml.etree.ElementTree import XMLPullParser
+
+from estat_api.exceptions import EstatAPIError
+
+# 統計データの1件を表す要素のタグ名
+VALUE_TAG: str = "VALUE"
+
+
+def iter_values(chunks: Iterable[bytes], tag: str = VALUE_TAG) -> Iterator[Dict[str, Any]]:
+    """
+    XMLレスポンスの本文をチャンク単位で読み込み、`<VALUE>` 要素を順に返します。
+
+    処理済みの要素は親要素から取り除くため、レスポンスの大きさに関わらず
+    使用メモリはほぼ一定です。各レコードは JSON 形式の VALUE と同じく、
+    属性を '@' 付きのキー、値を '$' キーに格納した辞書です。
+    `<RESULT>` の STATUS が 0 以外の場合は EstatAPIError を送出します。
+
+    Args:
+        chunks (Iterable[bytes]): レスポンス本文のチャンク。
+        tag (str, optional): レコードとして取り出す要素のタグ名。デフォルトは "VALUE"。
+
+    Yields:
+        dict: 例 {"@tab": "020", "@area": "13000", "@time": "2020000000", "$": "123"}
+
+    Raises:
+        EstatAPIError: e-Stat API がエラーを返した場合。
+    """
+    parser = XMLPullParser(events=("start", "end"))
+    stack = []
+    for chunk in chunks:
+        if not chunk:
+            continue
+        parser.feed(chunk)
+        yield from _drain(parser, stack, tag)
+    parser.close()
+    yield from _drain(parser, stack, tag)
+
+
+def _drain(parser, stack, tag):
+    """
+    パーサに溜まったイベントを処理し、完成したレコードを返します。
+    """
+    for event, elem in parser.read_events():
+        if event == "start":
+            stack.append(elem)
+            continue
+        stack.pop()
+        if elem.tag == "RESULT" and len(stack) == 1:
+            _check_result(elem)
+        if elem.tag != tag:
+            continue
+        record = {f"@{k}": v for k, v in elem.attrib.items()}
+        record["$"] = elem.text
+        elem.clear()
+        if stack:
+            stack[-1].remove(elem)
+        yield record
+
+
+def _check_result(result) -> None:
+    """
+    `<RESULT>` 要素の STATUS が 0 以外の場合に EstatAPIError を送出します。
+    """
+    status = (result.findtext("STATUS") or "0").strip()
+    if status != "0":
+        raise EstatAPIError(int(status), result.findtext("ERROR_MSG") or "")
@@ -0,0 +1,106 @@
+"""test_dataset_manager.py
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+from estat_api.dataset_manager import DatasetManager
+
+
+class TestDatasetManager(unittest.TestCase):
+    """DatasetManagerクラスのテストコード"""
+
+    def setUp(self):
+        """各テストの前に実行されるセットアップ処理"""
+        self.api = MagicMock()
+        self.api.post_dataset.return_value = {
+            "POST_DATASET": {"RESULT": {"STATUS": 0}, "DATASET_ID": "DS001"}
+        }
+        self.api.ref_dataset.return_value = {
+            "REF_DATASET": {"RESULT": {"STATUS": 0}}
+        }
+        self.manager = DatasetManager(self.api, min_hits=2)
+
+    def test_register_after_min_hits(self):
+        """利用回数が min_hits に達したら dataSetId 経由になるかのテスト"""
+        self.manager.get_stats_data(
+            statsDataId="0001", cdArea=["13000", "01000"], limit=10)
+        self.api.get_stats_data.assert_called_with(
+            "json", statsDataId="0001", cdArea=["13000", "01000"], limit=10)
+        self.api.post_dataset.assert_not_called()
+
+        self.manager.get_stats_data(
+            statsDataId="0001", cdArea="01000, 13000,13000", limit=10)
+        self.api.post_dataset.assert_called_once_with(
+            cdArea="01000,13000", processMode="E", statsDataId="0001",
+            dataSetName=unittest.mock.ANY)
+        self.api.get_stats_data.assert_called_with(
+            "json", limit=10, dataSetId="DS001")
+
+    def test_get_stats_datas_uses_dataset_id(self):
+        """getStatsDatas の条件が dataSetId に書き換えられるかのテスト"""
+        self.manager.register("0001", cdTime="2020000000")
+        spec = [
+            {"statsDataId": "0001", "cdTime": "2020000000"},
+            {"statsDataId": "0002"},
+        ]
+        self.manager.get_stats_datas(spec, metaGetFlg="N")
+        self.api.get_stats_datas.assert_called_once_with(
+            [{"dataSetId": "DS001"}, {"statsDataId": "0002"}],
+            "json", metaGetFlg="N")
+
+    def test_stale_dataset_is_reregistered(self):
+        """refDataset で見つからないデータセットを登録し直すかのテスト"""
+        key = DatasetManager.make_key("0001", {"cdArea": "13000"})
+        self.manager.mapping[key] = "DS_OLD"
+        self.api.ref_dataset.return_value = {
+            "REF_DATASET": {"RESULT": {"STATUS": 100}}
+        }
+        params = self.manager.resolve({"statsDataId": "0001", "cdArea": "13000"})
+        self.api.ref_dataset.assert_called_once_with(dataSetId="DS_OLD")
+        self.assertNotIn(key, self.manager.mapping)
+        self.assertEqual(params, {"statsDataId": "0001", "cdArea": "13000"})
+
+    def test_mapping_persisted_and_verified(self):
+        """対応表を保存し、別のインスタンスで refDataset による確認後に再利用するかのテスト"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "datasets.json")
+            manager = DatasetManager(self.api, min_hits=1, path=path)
+            manager.resolve({"statsDataId": "0001", "cdArea": "13000"})
+            self.api.ref_dataset.assert_not_called()
+
+            reloaded = DatasetManager(self.api, min_hits=1, path=path)
+            params = reloaded.resolve({"statsDataId": "0001", "cdArea": "13000"})
+        self.assertEqual(params, {"dataSetId": "DS001"})
+        self.api.post_dataset.assert_called_once()
+        self.api.ref_dataset.assert_called_once_with(dataSetId="DS001")
+
+    def test_register_failure(self):
+        """登録に失敗した場合に元のパラメータを使うかのテスト"""
+        self.api.post_dataset.return_value = None
+        manager = DatasetManager(self.api, min_hits=1)
+        params = manager.resolve({"statsDataId": "0001", "cdArea": "13000"})
+        self.assertEqual(params, {"statsDataId": "0001", "cdArea": "13000"})
+        self.assertEqual(manager.mapping, {})
+
+        for _ in range(5):
+            manager.resolve({"statsDataId": "0001", "cdArea": "13000"})
+        self.api.post_dataset.assert_called_once()
+
+    def test_unverifiable_dataset_is_kept(self):
+        """refDataset が通信エラーの場合に対応表を残すかのテスト"""
+        key = DatasetManager.make_key("0001", {"cdArea": "13000"})
+        self.manager.mapping[key] = "DS001"
+        self.api.ref_dataset.return_value = None
+        params = self.manager.resolve({"statsDataId": "0001", "cdArea": "13000"})
+        self.assertEqual(params, {"dataSetId": "DS001"})
+        self.assertIn(key, self.manager.mapping)
+        self.api.post_dataset.assert_not_called()
+
+        self.manager.resolve({"statsDataId": "0001", "cdArea": "13000"})
+        self.assertEqual(self.api.ref_dataset.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
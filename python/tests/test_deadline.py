@@ -0,0 +1,172 @@
+"""test_deadline.py
+"""
+
+import io
+import threading
+import unittest
+from unittest.mock import patch, MagicMock
+from estat_api.api import EstatAPI
+from estat_api.hedging import HedgePolicy
+
+
+class TestDeadline(unittest.TestCase):
+    """期限とタイムアウト設定のテストコード"""
+
+    def setUp(self):
+        """各テストの前に実行されるセットアップ処理"""
+        self.api = EstatAPI(
+            app_id="test_app_id_12345", connect_timeout=3, read_timeout=20)
+
+    @patch('estat_api.api.requests.get')
+    def test_connect_and_read_timeout(self, mock_get):
+        """接続・読み込みタイムアウトが個別に渡されるかのテスト"""
+        mock_get.return_value = MagicMock(content=b"{}")
+        self.api.get_stats_list(searchWord="test")
+        self.assertEqual(mock_get.call_args[1]["timeout"], (3, 20))
+
+    @patch('estat_api.api.requests.get')
+    def test_deadline_clamps_timeout(self, mock_get):
+        """期限内のリクエストのタイムアウトが残り時間以下になるかのテスト"""
+        mock_get.return_value = MagicMock(content=b"{}")
+        with self.api.deadline(5):
+            with self.api.deadline(60):
+                self.api.get_stats_list()
+        connect, read = mock_get.call_args[1]["timeout"]
+        self.assertEqual(connect, 3)
+        self.assertLessEqual(read, 5)
+
+    @patch('estat_api.api.requests.get')
+    def test_expired_deadline(self, mock_get):
+        """期限切れの場合にリクエストを送らず None を返すかのテスト"""
+        with self.api.deadline(0):
+            result = self.api.get_stats_data(statsDataId="0001")
+        self.assertIsNone(result)
+        mock_get.assert_not_called()
+
+    @patch('estat_api.api.requests.get')
+    def test_hedge_timeout_clamped_when_sent(self, mock_get):
+        """遅れて送られるヘッジのタイムアウトも送信時点の残り時間で切り詰めるかのテスト"""
+        clock = [0.0]
+        policy = MagicMock()
+
+        def run(send, key):
+            # ヘッジを送るまでに8秒経過した状態を再現します
+            clock[0] = 8.0
+            return send()
+
+        policy.run.side_effect = run
+        mock_get.return_value = MagicMock(content=b"{}")
+        api = EstatAPI(app_id="test_app_id_12345", read_timeout=20, hedge=policy)
+        with patch('estat_api.deadline.time.monotonic', side_effect=lambda: clock[0]):
+            with api.deadline(10):
+                api.get_stats_list()
+        connect, read = mock_get.call_args[1]["timeout"]
+        self.assertLessEqual(connect, 2)
+        self.assertLessEqual(read, 2)
+
+    @patch('estat_api.api.requests.get')
+    def test_deadline_checked_while_streaming_to_sink(self, mock_get):
+        """sink への書き込み中に期限を過ぎた場合に中断するかのテスト"""
+        mock_res = MagicMock()
+        mock_res.iter_content.return_value = iter([b"a", b"b", b"c"])
+        mock_get.return_value = mock_res
+        sink = io.BytesIO()
+        with patch('estat_api.deadline.time.monotonic', side_effect=[0.0, 1.0, 2.0, 11.0]):
+            with self.api.deadline(10):
+                result = self.api.get_stats_data(statsDataId="0001", sink=sink)
+        self.assertIsNone(result)
+        self.assertEqual(sink.getvalue(), b"a")
+
+
+class TestHedgePolicy(unittest.TestCase):
+    """HedgePolicyクラスのテストコード"""
+
+    def test_no_hedge_before_min_samples(self):
+        """計測数が足りない間はヘッジしないかのテスト"""
+        policy = HedgePolicy(min_samples=2, max_rate=1.0)
+        func = MagicMock(return_value="ok")
+        self.assertEqual(policy.run(func), "ok")
+        self.assertEqual(func.call_count, 1)
+        self.assertEqual(policy.hedges, 0)
+
+    def test_hedge_wins(self):
+        """遅いリクエストに対してヘッジが先に返るかのテスト"""
+        policy = HedgePolicy(min_samples=1, max_rate=1.0)
+        policy.record(0.01)
+        release = threading.Event()
+        calls = []
+
+        def func():
+            calls.append(None)
+            if len(calls) == 1:
+                release.wait(5)
+                return "slow"
+            return "fast"
+
+        try:
+            self.assertEqual(policy.run(func), "fast")
+            self.assertEqual(policy.hedges, 1)
+        finally:
+            release.set()
+            policy.close()
+
+    def test_hedge_rate_cap(self):
+        """ヘッジ数が上限割合を超えないかのテスト"""
+        policy = HedgePolicy(min_samples=1, max_rate=0.0)
+        policy.record(0.0)
+        release = threading.Event()
+        func = MagicMock(side_effect=lambda: release.wait(0.05) or "ok")
+        try:
+            self.assertEqual(policy.run(func), "ok")
+            self.assertEqual(func.call_count, 1)
+            self.assertEqual(policy.hedges, 0)
+        finally:
+            policy.close()
+
+    @patch('estat_api.api.requests.get')
+    def test_api_hedges_get(self, mock_get):
+        """EstatAPI が GET リクエストをヘッジ経由で送るかのテスト"""
+        policy = MagicMock()
+        policy.run.side_effect = lambda send, key: send()
+        mock_get.return_value = MagicMock(content=b"{}")
+        api = EstatAPI(app_id="test_app_id_12345", hedge=policy)
+        api.get_stats_list()
+        policy.run.assert_called_once()
+        self.assertEqual(policy.run.call_args[1]["key"], "getStatsList")
+
+    def test_latency_window_per_key(self):
+        """レイテンシの計測がキーごとに分かれるかのテスト"""
+        policy = HedgePolicy(min_samples=1)
+        policy.record(0.5, key="getStatsData")
+        self.assertEqual(policy.delay("getStatsData"), 0.5)
+        self.assertIsNone(policy.delay("getMetaInfo"))
+
+    def test_primary_not_in_hedge_pool(self):
+        """元のリクエストがヘッジ用プールを使わず、同時ヘッジ数を超えないかのテスト"""
+        policy = HedgePolicy(min_samples=1, max_rate=1.0, max_workers=1)
+        policy.record(0.0)
+        release = threading.Event()
+        results = []
+        func = MagicMock(side_effect=lambda: release.wait(5) and "ok")
+        threads = [threading.Thread(target=lambda: results.append(policy.run(func)))
+                   for _ in range(3)]
+        try:
+            for t in threads:
+                t.start()
+            for _ in range(100):
+                if func.call_count >= 4:
+                    break
+                threading.Event().wait(0.01)
+            # 元のリクエスト3本はすべて実行され、ヘッジは1本だけ
+            self.assertEqual(func.call_count, 4)
+            self.assertEqual(policy.hedges, 1)
+        finally:
+            release.set()
+            for t in threads:
+                t.join()
+            policy.close()
+        self.assertEqual(results, ["ok", "ok", "ok"])
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
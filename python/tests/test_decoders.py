@@ -0,0 +1,104 @@
+"""test_decoders.py
+"""
+
+import io
+import json
+import unittest
+from unittest.mock import patch, MagicMock
+import requests
+from estat_api.api import EstatAPI
+from estat_api import decoders
+from estat_api.decoders import get_decoder
+
+BODY = json.dumps({"GET_STATS_DATA": {
+    "RESULT": {"STATUS": 0, "ERROR_MSG": "正常に終了しました。"},
+    "STATISTICAL_DATA": {
+        "RESULT_INF": {"TOTAL_NUMBER": 2, "FROM_NUMBER": 1, "TO_NUMBER": 1, "NEXT_KEY": 2},
+        "DATA_INF": {"VALUE": {"@tab": "020", "@cat01": "100", "$": "123"}},
+    }}}, ensure_ascii=False).encode("utf-8")
+
+
+class TestDecoders(unittest.TestCase):
+    """JSONデコーダのテストコード"""
+
+    def test_get_decoder(self):
+        """バックエンド名に応じたデコーダを返すかのテスト"""
+        self.assertEqual(get_decoder("json")(b'{"a": 1}'), {"a": 1})
+        self.assertEqual(get_decoder("auto")(b'{"a": 1}'), {"a": 1})
+        with self.assertRaises(ValueError):
+            get_decoder("simplejson")
+
+    @patch('estat_api.decoders.orjson', None)
+    @patch('estat_api.decoders.msgspec', None)
+    def test_fallback_to_stdlib(self):
+        """高速なデコーダがない場合に標準ライブラリを使うかのテスト"""
+        self.assertIs(get_decoder("auto"), json.loads)
+        with self.assertRaises(ImportError):
+            get_decoder("orjson")
+
+    @unittest.skipUnless(decoders.orjson, "orjson がインストールされていません")
+    def test_orjson(self):
+        """orjson でバイト列を直接デコードするかのテスト"""
+        self.assertEqual(get_decoder("orjson")(BODY), json.loads(BODY))
+
+    @patch('estat_api.api.requests.get')
+    def test_api_decodes_bytes(self, mock_get):
+        """テキストを経由せずにバイト列からデコードするかのテスト"""
+        mock_res = MagicMock(content=BODY)
+        mock_get.return_value = mock_res
+        api = EstatAPI(app_id="test_app_id_12345", json_decoder="json")
+
+        result = api.get_stats_data(statsDataId="0001")
+
+        self.assertEqual(result, json.loads(BODY))
+        mock_res.json.assert_not_called()
+
+    def test_non_json_body_returns_none(self):
+        """200 で JSON 以外の本文が返った場合に None を返すかのテスト"""
+        html = "<html><body>メンテナンス中です</body></html>".encode("utf-8")
+        backends = ["json"] + [name for name in ("orjson", "msgspec")
+                               if getattr(decoders, name) is not None]
+        for backend in backends:
+            with self.subTest(backend=backend), \
+                    patch('estat_api.api.requests.get') as mock_get:
+                response = requests.Response()
+                response.status_code = 200
+                response._content = html
+                mock_get.return_value = response
+                api = EstatAPI(app_id="test_app_id_12345", json_decoder=backend)
+                self.assertIsNone(api.get_stats_data(statsDataId="0001"))
+                if decoders.msgspec is not None:
+                    self.assertIsNone(api.get_stats_data_typed(statsDataId="0001"))
+
+    def test_non_decode_value_error_propagates(self):
+        """デコード以外の ValueError はデコードエラーとして扱わないかのテスト"""
+        api = EstatAPI(app_id="test_app_id_12345")
+        with self.assertRaises(ValueError):
+            api._make_request('PUT', 'getStatsList')
+
+        sink = io.BytesIO()
+        sink.close()
+        with patch('estat_api.api.requests.get') as mock_get:
+            mock_get.return_value = MagicMock(iter_content=MagicMock(return_value=[b"{}"]))
+            with self.assertRaises(ValueError):
+                api.get_stats_data(statsDataId="0001", sink=sink)
+
+    @unittest.skipUnless(decoders.msgspec, "msgspec がインストールされていません")
+    @patch('estat_api.api.requests.get')
+    def test_get_stats_data_typed(self, mock_get):
+        """getStatsData を型付き構造体にデコードするかのテスト"""
+        mock_get.return_value = MagicMock(content=BODY)
+        api = EstatAPI(app_id="test_app_id_12345")
+
+        result = api.get_stats_data_typed(statsDataId="0001")
+
+        statistical_data = result.GET_STATS_DATA.STATISTICAL_DATA
+        self.assertEqual(result.GET_STATS_DATA.RESULT.STATUS, 0)
+        self.assertEqual(statistical_data.RESULT_INF.NEXT_KEY, 2)
+        self.assertEqual(len(statistical_data.DATA_INF.VALUE), 1)
+        value = statistical_data.DATA_INF.VALUE[0]
+        self.assertEqual((value.tab, value.cat01, value.value), ("020", "100", "123"))
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,210 @@
+"""test_downloader.py
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+from estat_api.deadline import Deadline
+from estat_api.downloader import (
+    download_catalog_resources, download_resource, iter_catalog_resources
+)
+
+
+def _catalog(resources, next_key=None):
+    """getDataCatalog のJSONレスポンスを作成するヘルパー関数"""
+    result_inf = {} if next_key is None else {"NEXT_KEY": next_key}
+    return {"GET_DATA_CATALOG": {"DATA_CATALOG_LIST_INF": {
+        "RESULT_INF": result_inf,
+        "DATA_CATALOG_INF": {"RESOURCES": {"RESOURCE": resources}},
+    }}}
+
+
+def _response(status_code, body, headers=None):
+    """ストリーミング用のMockレスポンスオブジェクトを作成するヘルパー関数"""
+    mock_res = MagicMock()
+    mock_res.status_code = status_code
+    mock_res.headers = headers or {}
+    mock_res.iter_content.return_value = [body]
+    mock_res.__enter__.return_value = mock_res
+    return mock_res
+
+
+RESOURCE = {"@id": "R001", "URL": "https://example.com/file?id=1",
+            "FORMAT": "CSV", "LAST_MODIFIED_DATE": "2024-01-01"}
+
+
+class TestDownloader(unittest.TestCase):
+    """データカタログのダウンロード機能のテストコード"""
+
+    def setUp(self):
+        """各テストの前に実行されるセットアップ処理"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dest = self.tmp.name
+        self.session = MagicMock()
+
+    def tearDown(self):
+        """各テストの後に実行される後処理"""
+        self.tmp.cleanup()
+
+    def test_iter_catalog_resources_pages(self):
+        """NEXT_KEY に従ってカタログをページングするかのテスト"""
+        api = MagicMock()
+        api.get_data_catalog.side_effect = [
+            _catalog([RESOURCE], next_key=101),
+            _catalog(dict(RESOURCE, **{"@id": "R002"})),
+        ]
+        ids = [r["@id"] for r in iter_catalog_resources(api, searchWord="人口")]
+        self.assertEqual(ids, ["R001", "R002"])
+        self.assertEqual(api.get_data_catalog.call_args_list[1][1],
+                         {"searchWord": "人口", "startPosition": 101})
+
+    def test_download_then_skip(self):
+        """ダウンロード後、変更がなければスキップするかのテスト"""
+        self.session.get.return_value = _response(200, b"a,b\n1,2\n")
+        self.session.head.return_value = _response(200, b"", {"Content-Length": "8"})
+        result = download_resource(self.session, RESOURCE, self.dest)
+        self.assertEqual(result["status"], "downloaded")
+        with open(os.path.join(self.dest, "R001.csv"), "rb") as f:
+            self.assertEqual(f.read(), b"a,b\n1,2\n")
+
+        result = download_resource(self.session, RESOURCE, self.dest)
+        self.assertEqual(result["status"], "skipped")
+        self.session.get.assert_called_once()
+
+        updated = dict(RESOURCE, LAST_MODIFIED_DATE="2024-02-01")
+        result = download_resource(self.session, updated, self.dest)
+        self.assertEqual(result["status"], "downloaded")
+
+    def test_server_size_change_redownloads(self):
+        """サーバ側のサイズが変わった場合に取り直すかのテスト"""
+        self.session.get.return_value = _response(200, b"a,b\n1,2\n")
+        download_resource(self.session, RESOURCE, self.dest)
+
+        self.session.head.return_value = _response(200, b"", {"Content-Length": "12"})
+        self.session.get.return_value = _response(200, b"a,b\n1,2\n3,4\n")
+        result = download_resource(self.session, RESOURCE, self.dest)
+        self.assertEqual(result["status"], "downloaded")
+        self.assertEqual(result["bytes"], 12)
+
+    def test_no_last_modified_date_uses_validators(self):
+        """LAST_MODIFIED_DATE が無い場合に ETag で変更を確認するかのテスト"""
+        resource = dict(RESOURCE)
+        del resource["LAST_MODIFIED_DATE"]
+        self.session.get.return_value = _response(200, b"x", {"ETag": '"v1"'})
+        download_resource(self.session, resource, self.dest)
+
+        self.session.head.return_value = _response(200, b"", {"ETag": '"v1"'})
+        result = download_resource(self.session, resource, self.dest)
+        self.assertEqual(result["status"], "skipped")
+
+        self.session.head.return_value = _response(200, b"", {"ETag": '"v2"'})
+        result = download_resource(self.session, resource, self.dest)
+        self.assertEqual(result["status"], "downloaded")
+
+        self.session.head.return_value = _response(200, b"", {})
+        result = download_resource(self.session, resource, self.dest)
+        self.assertEqual(result["status"], "downloaded")
+
+    def _write_part(self, body, last_modified="2024-01-01", etag='"v1"'):
+        """途中まで保存した `.part` ファイルを作成するヘルパー関数"""
+        part_path = os.path.join(self.dest, "R001.csv.part")
+        with open(part_path, "wb") as f:
+            f.write(body)
+        with open(part_path + ".meta.json", "w", encoding="utf-8") as f:
+            json.dump({"last_modified": last_modified, "etag": etag}, f)
+
+    def test_resume_partial_file(self):
+        """途中まで保存したファイルを Range と If-Range で続きから取得するかのテスト"""
+        self._write_part(b"a,b\n")
+        self.session.get.return_value = _response(206, b"1,2\n")
+        result = download_resource(self.session, RESOURCE, self.dest)
+
+        self.assertEqual(result["status"], "resumed")
+        self.assertEqual(self.session.get.call_args[1]["headers"],
+                         {"Range": "bytes=4-", "If-Range": '"v1"'})
+        with open(os.path.join(self.dest, "R001.csv"), "rb") as f:
+            self.assertEqual(f.read(), b"a,b\n1,2\n")
+        self.assertFalse(os.path.exists(
+            os.path.join(self.dest, "R001.csv.part.meta.json")))
+
+    def test_stale_partial_file_is_discarded(self):
+        """カタログの最終更新日が変わった `.part` を破棄するかのテスト"""
+        self._write_part(b"old", last_modified="2023-12-01")
+        self.session.get.return_value = _response(200, b"new")
+        result = download_resource(self.session, RESOURCE, self.dest)
+
+        self.assertEqual(result["status"], "downloaded")
+        self.assertEqual(self.session.get.call_args[1]["headers"], {})
+        with open(os.path.join(self.dest, "R001.csv"), "rb") as f:
+            self.assertEqual(f.read(), b"new")
+
+    def test_if_range_mismatch_restarts(self):
+        """If-Range が一致せず全体が返った場合に上書きするかのテスト"""
+        self._write_part(b"old")
+        self.session.get.return_value = _response(200, b"a,b\n1,2\n")
+        download_resource(self.session, RESOURCE, self.dest)
+        with open(os.path.join(self.dest, "R001.csv"), "rb") as f:
+            self.assertEqual(f.read(), b"a,b\n1,2\n")
+
+    def test_416_checks_size(self):
+        """416 の場合に全体サイズを確認し、一致しなければ取り直すかのテスト"""
+        self._write_part(b"a,b\n")
+        self.session.get.side_effect = [
+            _response(416, b"", {"Content-Range": "bytes */8"}),
+            _response(200, b"a,b\n1,2\n"),
+        ]
+        result = download_resource(self.session, RESOURCE, self.dest)
+
+        self.assertEqual(result["status"], "downloaded")
+        self.assertEqual(self.session.get.call_args[1]["headers"], {})
+        with open(os.path.join(self.dest, "R001.csv"), "rb") as f:
+            self.assertEqual(f.read(), b"a,b\n1,2\n")
+
+    @patch('estat_api.downloader.open', side_effect=OSError("No space left on device"))
+    def test_disk_error_is_reported(self, _mock_open):
+        """書き込みエラーを例外にせず failed として返すかのテスト"""
+        self.session.get.return_value = _response(200, b"x")
+        result = download_resource(self.session, RESOURCE, self.dest)
+        self.assertEqual(result["status"], "failed")
+
+    def test_download_catalog_resources(self):
+        """カタログの全リソースを並列にダウンロードするかのテスト"""
+        api = MagicMock()
+        api.get_data_catalog.return_value = _catalog([
+            RESOURCE, dict(RESOURCE, **{"@id": "R002"})])
+        self.session.get.side_effect = lambda *a, **k: _response(200, b"x")
+        results = download_catalog_resources(
+            api, self.dest, max_workers=2, session=self.session)
+        self.assertEqual(sorted(r["status"] for r in results),
+                         ["downloaded", "downloaded"])
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "R002.csv")))
+
+    def test_deadline_applies_to_workers(self):
+        """api.deadline の期限がダウンロード用のスレッドにも適用されるかのテスト"""
+        api = MagicMock()
+        api.get_data_catalog.return_value = _catalog([RESOURCE])
+        api.current_deadline.return_value = Deadline(0)
+        results = download_catalog_resources(
+            api, self.dest, max_workers=2, session=self.session)
+        self.assertEqual([r["status"] for r in results], ["failed"])
+        self.session.get.assert_not_called()
+
+    def test_deadline_checked_between_chunks(self):
+        """書き込み中に期限を過ぎた場合に中断するかのテスト"""
+        response = _response(200, b"")
+        response.iter_content.return_value = [b"a", b"b"]
+        self.session.get.return_value = response
+        deadline = Deadline(10)
+        with patch('estat_api.deadline.time.monotonic', side_effect=[0.0, 1.0, 11.0]):
+            deadline.expires_at = 10.0
+            result = download_resource(
+                self.session, RESOURCE, self.dest, timeout=(3, 20), deadline=deadline)
+        self.assertEqual(result["status"], "failed")
+        self.assertEqual(self.session.get.call_args[1]["timeout"], (3, 10.0))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "R001.csv")))
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
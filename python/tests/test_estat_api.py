@@ -1,7 +1,10 @@
 """test_estat_api.py
 """
 
+import io
 import json
+import os
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock
 import requests
@@ -22,6 +25,7 @@ class TestEstatAPI(unittest.TestCase):
         mock_res = MagicMock()
         mock_res.status_code = status_code
         mock_res.json.return_value = json_data
+        mock_res.content = json.dumps(json_data).encode("utf-8")
         # raise_for_status()がHTTPErrorを投げるように設定
         if status_code >= 400:
             mock_res.raise_for_status.side_effect = requests.exceptions.HTTPError(
@@ -141,6 +145,55 @@ class TestEstatAPI(unittest.TestCase):
             expected_url, data=expected_data, headers={})
         self.assertEqual(result, expected_response)
 
+    @patch('estat_api.api.requests.get')
+    def test_get_stats_data_sink_buffer(self, mock_get):
+        """2.3. 統計データ取得 (getStatsData) のレスポンスをバッファへ書き込むテスト"""
+        mock_res = self._create_mock_response(200, {})
+        mock_res.iter_content.return_value = [b'{"GET_STATS', b'_DATA": {}}']
+        mock_get.return_value = mock_res
+
+        sink = io.BytesIO()
+        result = self.api.get_stats_data(statsDataId="0001", sink=sink)
+
+        self.assertEqual(sink.getvalue(), b'{"GET_STATS_DATA": {}}')
+        self.assertEqual(result["status"], 200)
+        self.assertEqual(result["bytes"], 22)
+        self.assertIn("elapsed", result)
+        self.assertTrue(mock_get.call_args[1]["stream"])
+        mock_res.json.assert_not_called()
+
+    @patch('estat_api.api.requests.post')
+    def test_get_stats_datas_sink_path(self, mock_post):
+        """2.7. 統計データ一括取得 (getStatsDatas) のレスポンスをファイルへ書き込むテスト"""
+        mock_res = self._create_mock_response(200, {})
+        mock_res.iter_content.return_value = [b"a,b\n", b"1,2\n"]
+        mock_post.return_value = mock_res
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "datas.csv")
+            result = self.api.get_stats_datas(
+                [{"statsDataId": "0001"}], data_format="csv", sink=path)
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), b"a,b\n1,2\n")
+        self.assertEqual(result["bytes"], 8)
+
+    @patch('estat_api.api.requests.get')
+    def test_sink_path_not_left_truncated(self, mock_get):
+        """ファイルへの書き込み中に失敗した場合に途中までのファイルを残さないかのテスト"""
+        def chunks(_size):
+            yield b"a,b\n"
+            raise requests.exceptions.ChunkedEncodingError("Connection reset by peer")
+
+        mock_res = self._create_mock_response(200, {})
+        mock_res.iter_content.side_effect = chunks
+        mock_get.return_value = mock_res
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "data.csv")
+            result = self.api.get_stats_data("csv", statsDataId="0001", sink=path)
+            self.assertIsNone(result)
+            self.assertEqual(os.listdir(tmp), [])
+
     def test_init_no_app_id(self):
         """appIdなしで初期化した場合にValueErrorを送出するかのテスト"""
         with self.assertRaises(ValueError):
@@ -0,0 +1,121 @@
+"""test_local_query.py
+"""
+
+import unittest
+from unittest.mock import MagicMock
+from estat_api.local_query import LocalStatsDataEngine
+from estat_api.parameters.stats_data import StatsDataParameters
+
+VALUES = [
+    {"@tab": "020", "@cat01": "100", "@area": "13000", "@time": "2020000000", "$": "1"},
+    {"@tab": "020", "@cat01": "110", "@area": "13000", "@time": "2020000000", "$": "2"},
+    {"@tab": "020", "@cat01": "100", "@area": "01000", "@time": "2020000000", "$": "3"},
+    {"@tab": "020", "@cat01": "100", "@area": "13000", "@time": "2015000000", "$": "4"},
+]
+
+
+def _page(values, next_key=None):
+    """getStatsData のJSONレスポンスを作成するヘルパー関数"""
+    result_inf = {"TOTAL_NUMBER": len(VALUES)}
+    if next_key is not None:
+        result_inf["NEXT_KEY"] = next_key
+    return {"GET_STATS_DATA": {
+        "RESULT": {"STATUS": 0},
+        "STATISTICAL_DATA": {
+            "RESULT_INF": result_inf,
+            "CLASS_INF": {"CLASS_OBJ": []},
+            "DATA_INF": {"VALUE": values},
+        }}}
+
+
+class TestLocalStatsDataEngine(unittest.TestCase):
+    """LocalStatsDataEngineクラスのテストコード"""
+
+    def setUp(self):
+        """各テストの前に実行されるセットアップ処理"""
+        self.api = MagicMock()
+        self.api.get_stats_data.side_effect = [
+            _page(VALUES[:2], next_key=3), _page(VALUES[2:])]
+        self.engine = LocalStatsDataEngine(self.api, page_limit=2)
+
+    def _values(self, response):
+        """レスポンスから値の一覧を取り出すヘルパー関数"""
+        data = response["GET_STATS_DATA"]["STATISTICAL_DATA"]["DATA_INF"]["VALUE"]
+        return [v["$"] for v in data]
+
+    def test_filters_answered_locally(self):
+        """2回目以降の絞り込みがネットワーク通信なしで答えられるかのテスト"""
+        result = self.engine.get_stats_data(
+            statsDataId="0001", cdArea="13000", cdCat01="100")
+        self.assertEqual(self._values(result), ["1", "4"])
+        self.assertEqual(self.api.get_stats_data.call_count, 2)
+
+        result = self.engine.get_stats_data(
+            statsDataId="0001", cdTime=["2020000000"], cdArea="13000,01000")
+        self.assertEqual(self._values(result), ["1", "2", "3"])
+        result_inf = result["GET_STATS_DATA"]["STATISTICAL_DATA"]["RESULT_INF"]
+        self.assertEqual(result_inf["TOTAL_NUMBER"], 3)
+        self.assertNotIn("NEXT_KEY", result_inf)
+        self.assertEqual(self.api.get_stats_data.call_count, 2)
+
+    def test_codes_are_stripped(self):
+        """カンマの後の空白を含むコードも DatasetManager と同様に扱うかのテスト"""
+        result = self.engine.get_stats_data(
+            statsDataId="0001", cdArea="13000, 01000", cdTime="2020000000")
+        self.assertEqual(self._values(result), ["1", "2", "3"])
+
+    def test_load_skips_meta_after_first_page(self):
+        """2ページ目以降は metaGetFlg='N' で取得するかのテスト"""
+        self.engine.load("0001")
+        first, second = self.api.get_stats_data.call_args_list
+        self.assertNotIn("metaGetFlg", first[1])
+        self.assertEqual(second[1]["metaGetFlg"], "N")
+        self.assertEqual(second[1]["startPosition"], 3)
+
+    def test_results_do_not_share_cache(self):
+        """返したレスポンスを書き換えてもキャッシュに影響しないかのテスト"""
+        result = self.engine.get_stats_data(statsDataId="0001", cdArea="01000")
+        statistical_data = result["GET_STATS_DATA"]["STATISTICAL_DATA"]
+        statistical_data["DATA_INF"]["VALUE"][0]["$"] = "999"
+        statistical_data["CLASS_INF"]["CLASS_OBJ"].append({"@id": "x"})
+
+        result = self.engine.get_stats_data(statsDataId="0001", cdArea="01000")
+        statistical_data = result["GET_STATS_DATA"]["STATISTICAL_DATA"]
+        self.assertEqual(self._values(result), ["3"])
+        self.assertEqual(statistical_data["CLASS_INF"]["CLASS_OBJ"], [])
+
+    def test_paging_and_parameters_object(self):
+        """StatsDataParameters の指定とページングのテスト"""
+        params = StatsDataParameters(
+            stats_data_id="0001", start_position=2, limit=1, cdCat01="100")
+        result = self.engine.get_stats_data(params)
+        statistical_data = result["GET_STATS_DATA"]["STATISTICAL_DATA"]
+        self.assertEqual(self._values(result), ["3"])
+        self.assertEqual(statistical_data["RESULT_INF"]["NEXT_KEY"], 3)
+        self.assertNotIn("CLASS_INF", statistical_data)
+
+    def test_count_only_with_parameters_object(self):
+        """StatsDataParameters の cnt_get_flg='Y' で件数のみを返すかのテスト"""
+        params = StatsDataParameters(
+            stats_data_id="0001", cnt_get_flg='Y', cd_area="13000")
+        result = self.engine.get_stats_data(params=params)
+        statistical_data = result["GET_STATS_DATA"]["STATISTICAL_DATA"]
+        self.assertEqual(statistical_data["RESULT_INF"]["TOTAL_NUMBER"], 3)
+        self.assertNotIn("DATA_INF", statistical_data)
+
+    def test_signature_matches_api(self):
+        """EstatAPI.get_stats_data と同じく data_format を第1引数に取れるかのテスト"""
+        result = self.engine.get_stats_data("json", statsDataId="0001", cdArea="01000")
+        self.assertEqual(self._values(result), ["3"])
+
+    def test_unsupported_filter_is_delegated(self):
+        """範囲指定などの条件は API に委譲するかのテスト"""
+        self.api.get_stats_data.side_effect = None
+        self.engine.get_stats_data(statsDataId="0001", cdTimeFrom="2015000000")
+        self.api.get_stats_data.assert_called_once_with(
+            "json", statsDataId="0001", cdTimeFrom="2015000000")
+        self.assertEqual(self.engine.tables, {})
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,117 @@
+"""test_pager.py
+"""
+
+import json
+import unittest
+from unittest.mock import MagicMock
+import requests
+from urllib3.exceptions import ReadTimeoutError
+from estat_api.api import EstatAPI
+from estat_api.pager import AdaptivePager
+
+
+def _page(from_number, to_number, next_key=None):
+    """ページのJSONレスポンスを作成するヘルパー関数"""
+    result_inf = {"FROM_NUMBER": from_number, "TO_NUMBER": to_number}
+    if next_key is not None:
+        result_inf["NEXT_KEY"] = next_key
+    return {"GET_STATS_DATA": {"STATISTICAL_DATA": {"RESULT_INF": result_inf}}}
+
+
+def _response(json_data, n_bytes, elapsed=1.0):
+    """指定されたJSONデータとサイズを持つMockレスポンスと経過秒数の組を作成するヘルパー関数"""
+    body = json.dumps(json_data).encode("utf-8")
+    mock_res = MagicMock()
+    mock_res.content = body + b" " * (n_bytes - len(body))
+    return mock_res, elapsed
+
+
+class TestAdaptivePager(unittest.TestCase):
+    """AdaptivePagerクラスのテストコード"""
+
+    def setUp(self):
+        """各テストの前に実行されるセットアップ処理"""
+        self.api = EstatAPI(app_id="test_app_id_12345")
+        count = {"GET_STATS_DATA": {"STATISTICAL_DATA": {
+            "RESULT_INF": {"TOTAL_NUMBER": 3500}}}}
+        self.api.get_stats_data = MagicMock(return_value=count)
+
+    def test_limit_follows_target_latency(self):
+        """計測したレイテンシから limit が選ばれるかのテスト"""
+        # 1ページ目: 1000行で2秒 -> 目標5秒なら2500行
+        self.api.fetch_stats_data = MagicMock(side_effect=[
+            _response(_page(1, 1000, 1001), 100000, elapsed=2.0),
+            _response(_page(1001, 3500), 250000, elapsed=5.0),
+        ])
+        pager = AdaptivePager(self.api, target_sec=5.0, initial_limit=1000)
+        pages = list(pager.iter_pages(statsDataId="0001", cdArea="13000"))
+
+        self.assertEqual(len(pages), 2)
+        self.api.get_stats_data.assert_called_once_with(
+            statsDataId="0001", cdArea="13000", cntGetFlg="Y")
+        second = self.api.fetch_stats_data.call_args_list[1][1]
+        self.assertEqual(second["startPosition"], 1001)
+        self.assertEqual(second["limit"], 2500)
+        self.assertEqual([h["bytes"] for h in pager.history], [100000, 250000])
+
+    def test_shrink_on_timeout(self):
+        """タイムアウト時に limit を縮小して再試行するかのテスト"""
+        self.api.fetch_stats_data = MagicMock(side_effect=[
+            requests.exceptions.Timeout(),
+            _response(_page(1, 500), 1000),
+        ])
+        pager = AdaptivePager(self.api, initial_limit=1000, min_limit=100)
+        pages = list(pager.iter_pages(statsDataId="0001"))
+
+        self.assertEqual(len(pages), 1)
+        limits = [c[1]["limit"] for c in self.api.fetch_stats_data.call_args_list]
+        self.assertEqual(limits, [1000, 500])
+
+    def test_shrink_on_body_read_timeout(self):
+        """本文の読み込み中のタイムアウトでも limit を縮小するかのテスト"""
+        self.api.fetch_stats_data = MagicMock(side_effect=[
+            requests.exceptions.ConnectionError(
+                ReadTimeoutError(None, None, "Read timed out.")),
+            _response(_page(1, 500), 1000),
+        ])
+        pager = AdaptivePager(self.api, initial_limit=1000, min_limit=100)
+        pages = list(pager.iter_pages(statsDataId="0001"))
+
+        self.assertEqual(len(pages), 1)
+        limits = [c[1]["limit"] for c in self.api.fetch_stats_data.call_args_list]
+        self.assertEqual(limits, [1000, 500])
+
+    def test_connection_error_is_not_retried(self):
+        """タイムアウト以外の接続エラーはそのまま送出するかのテスト"""
+        self.api.fetch_stats_data = MagicMock(
+            side_effect=requests.exceptions.ConnectionError("refused"))
+        pager = AdaptivePager(self.api)
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            list(pager.iter_pages(statsDataId="0001"))
+        self.assertEqual(self.api.fetch_stats_data.call_count, 1)
+
+    def test_timeout_at_min_limit_raises(self):
+        """下限の limit でタイムアウトした場合に例外を送出するかのテスト"""
+        self.api.fetch_stats_data = MagicMock(side_effect=requests.exceptions.Timeout())
+        pager = AdaptivePager(self.api, initial_limit=100, min_limit=100)
+        with self.assertRaises(requests.exceptions.Timeout):
+            list(pager.iter_pages(statsDataId="0001"))
+
+    def test_max_page_bytes(self):
+        """1ページあたりのバイト数上限が limit に反映されるかのテスト"""
+        pager = AdaptivePager(self.api, max_page_bytes=50000)
+        pager.sec_per_row = 0.001
+        pager.bytes_per_row = 100.0
+        self.assertEqual(pager.next_limit(), 500)
+
+    def test_undecodable_page_raises(self):
+        """デコードできないページは None ではなく例外として送出するかのテスト"""
+        mock_res = MagicMock(content=b"<html>maintenance</html>")
+        self.api.fetch_stats_data = MagicMock(return_value=(mock_res, 1.0))
+        pager = AdaptivePager(self.api)
+        with self.assertRaises(ValueError):
+            list(pager.iter_pages(statsDataId="0001"))
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
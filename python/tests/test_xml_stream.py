@@ -0,0 +1,105 @@
+"""test_xml_stream.py
+"""
+
+import unittest
+from unittest.mock import patch, MagicMock
+import requests
+from estat_api.api import EstatAPI
+from estat_api.exceptions import EstatAPIError
+from estat_api.xml_stream import iter_values
+
+XML_BODY = """<?xml version="1.0" encoding="UTF-8"?>
+<GET_STATS_DATA>
+  <RESULT><STATUS>0</STATUS></RESULT>
+  <STATISTICAL_DATA>
+    <DATA_INF>
+      <NOTE char="***">該当データなし</NOTE>
+      <VALUE tab="020" area="13000" time="2020000000" unit="人">14047594</VALUE>
+      <VALUE tab="020" area="01000" time="2020000000" unit="人">5224614</VALUE>
+    </DATA_INF>
+  </STATISTICAL_DATA>
+</GET_STATS_DATA>
+""".encode("utf-8")
+
+
+def _chunks(data, size):
+    """バイト列を指定サイズのチャンクに分割するヘルパー関数"""
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestXmlStream(unittest.TestCase):
+    """XMLストリーミングのテストコード"""
+
+    def test_iter_values(self):
+        """チャンクの境界に関わらず VALUE 要素を取り出せるかのテスト"""
+        records = list(iter_values(_chunks(XML_BODY, 7)))
+        self.assertEqual(records, [
+            {"@tab": "020", "@area": "13000", "@time": "2020000000",
+             "@unit": "人", "$": "14047594"},
+            {"@tab": "020", "@area": "01000", "@time": "2020000000",
+             "@unit": "人", "$": "5224614"},
+        ])
+
+    @patch('estat_api.api.requests.get')
+    def test_iter_stats_data_xml(self, mock_get):
+        """getStatsData をXML形式でストリーミング取得するかのテスト"""
+        mock_res = MagicMock()
+        mock_res.iter_content.return_value = _chunks(XML_BODY, 64)
+        mock_get.return_value = mock_res
+
+        api = EstatAPI(app_id="test_app_id_12345")
+        records = list(api.iter_stats_data_xml(
+            chunk_size=64, statsDataId="0001"))
+
+        self.assertEqual([r["$"] for r in records], ["14047594", "5224614"])
+        mock_get.assert_called_once_with(
+            "https://api.e-stat.go.jp/rest/3.0/app/getStatsData",
+            timeout=30,
+            params={"appId": "test_app_id_12345", "statsDataId": "0001"},
+            stream=True)
+        mock_res.iter_content.assert_called_once_with(64)
+
+    @patch('estat_api.api.requests.get')
+    def test_mid_stream_error_raises(self, mock_get):
+        """本文の途中で接続が切れた場合に例外を送出するかのテスト"""
+        def chunks(_size):
+            yield XML_BODY[:XML_BODY.index(b"<VALUE", XML_BODY.index(b"</VALUE>"))]
+            raise requests.exceptions.ChunkedEncodingError("Connection reset by peer")
+
+        mock_res = MagicMock()
+        mock_res.iter_content.side_effect = chunks
+        mock_get.return_value = mock_res
+
+        api = EstatAPI(app_id="test_app_id_12345")
+        records = []
+        with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+            for record in api.iter_stats_data_xml(statsDataId="0001"):
+                records.append(record)
+        self.assertEqual([r["$"] for r in records], ["14047594"])
+
+    @patch('estat_api.api.requests.get')
+    def test_request_error_before_first_record(self, mock_get):
+        """最初のレコードより前のリクエストエラーは表示して終了するかのテスト"""
+        mock_get.side_effect = requests.exceptions.ConnectionError("refused")
+        api = EstatAPI(app_id="test_app_id_12345")
+        self.assertEqual(list(api.iter_stats_data_xml(statsDataId="0001")), [])
+
+    def test_error_status_raises(self):
+        """STATUS が 0 以外の場合に例外を送出するかのテスト"""
+        body = ("<GET_STATS_DATA><RESULT><STATUS>100</STATUS>"
+                "<ERROR_MSG>認証に失敗しました。</ERROR_MSG></RESULT>"
+                "</GET_STATS_DATA>").encode("utf-8")
+        with self.assertRaises(EstatAPIError) as cm:
+            list(iter_values(_chunks(body, 16)))
+        self.assertEqual(cm.exception.status, 100)
+        self.assertEqual(cm.exception.error_msg, "認証に失敗しました。")
+
+    def test_missing_id_raises_immediately(self):
+        """statsDataId がない場合に反復前に例外を送出するかのテスト"""
+        api = EstatAPI(app_id="test_app_id_12345")
+        with self.assertRaises(ValueError):
+            api.iter_stats_data_xml(cdArea="13000")
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)